@@ -0,0 +1,157 @@
+from collections import OrderedDict
+from typing import Optional, Tuple
+from urllib.parse import parse_qs
+import logging
+import math
+import os
+import time
+import orjson
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_MAX_IN_FLIGHT = int(os.environ.get("ADMISSION_MAX_IN_FLIGHT", "400"))
+RATE_LIMIT_RATE = float(os.environ.get("RATE_LIMIT_RATE", "0.5"))
+RATE_LIMIT_BURST = float(os.environ.get("RATE_LIMIT_BURST", "10"))
+RATE_LIMIT_MAX_CLIENTS = int(os.environ.get("RATE_LIMIT_MAX_CLIENTS", "10000"))
+RATE_LIMIT_TRUST_FORWARDED = os.environ.get("RATE_LIMIT_TRUST_FORWARDED", "0") == "1"
+
+ADMITTED = "admitted"
+RATE_LIMITED = "rate_limited"
+SATURATED = "saturated"
+
+
+class Admission:
+    """Per-client token buckets plus a ceiling on analyses in flight. A rate or ceiling of 0 turns that check off."""
+
+    def __init__(self, max_in_flight: int = ADMISSION_MAX_IN_FLIGHT, rate: float = RATE_LIMIT_RATE, burst: float = RATE_LIMIT_BURST, max_clients: int = RATE_LIMIT_MAX_CLIENTS):
+        self.max_in_flight = max_in_flight
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.in_flight = 0
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self.decisions = {ADMITTED: 0, RATE_LIMITED: 0, SATURATED: 0}
+
+    def _tokens(self, client: str, now: float) -> float:
+        tokens, updated = self._buckets.get(client, (self.burst, now))
+        return min(self.burst, tokens + (now - updated) * self.rate)
+
+    def acquire(self, client: str) -> Tuple[str, float]:
+        """Returns the decision and, when shed, the seconds after which a retry could be admitted."""
+        now = time.monotonic()
+        tokens = self.burst
+        if self.rate > 0:
+            tokens = self._tokens(client, now)
+            if tokens < 1:
+                self.decisions[RATE_LIMITED] += 1
+                return RATE_LIMITED, (1 - tokens) / self.rate
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            self.decisions[SATURATED] += 1
+            return SATURATED, 1.0
+        if self.rate > 0:
+            # Only admitted requests spend a token; shed ones are cheap to answer.
+            self._spend(client, tokens, now)
+        self.in_flight += 1
+        self.decisions[ADMITTED] += 1
+        return ADMITTED, 0.0
+
+    def limit(self, client: str) -> Tuple[str, float]:
+        """Token bucket only, for work that is queued rather than started (job submissions); holds no in-flight slot."""
+        if self.rate <= 0:
+            return ADMITTED, 0.0
+        now = time.monotonic()
+        tokens = self._tokens(client, now)
+        if tokens < 1:
+            self.decisions[RATE_LIMITED] += 1
+            return RATE_LIMITED, (1 - tokens) / self.rate
+        self._spend(client, tokens, now)
+        self.decisions[ADMITTED] += 1
+        return ADMITTED, 0.0
+
+    def _spend(self, client: str, tokens: float, now: float):
+        self._buckets[client] = (tokens - 1, now)
+        self._buckets.move_to_end(client)
+        while len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+
+    def release(self):
+        self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "rate": self.rate,
+            "burst": self.burst,
+            "clients": len(self._buckets),
+            "decisions": dict(self.decisions),
+        }
+
+
+def client_id(scope) -> str:
+    # Keyed by address only: a bearer token is not validated here, so a fresh one per request would buy a fresh bucket.
+    if RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = dict(scope.get("headers") or []).get(b"x-forwarded-for", b"")
+        if forwarded:
+            return "ip:" + forwarded.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown")
+
+
+class AdmissionMiddleware:
+    """Decides admission for /analyze-* requests and holds the in-flight slot until the response (stream included) ends.
+
+    Shed requests still reach their endpoint, which answers from the cache or the fallback
+    (see `shed_decision`), because only the endpoint has the parsed request to do that with.
+    Job submissions (/jobs/analyze-*) spend from the same per-client bucket and get a 429
+    when it is empty, so one client cannot fill the shared job queue.
+    """
+
+    def __init__(self, app, admission: Admission, prefix: str = "/analyze-", jobs_prefix: str = "/jobs/analyze-"):
+        self.app = app
+        self.admission = admission
+        self.prefix = prefix
+        self.jobs_prefix = jobs_prefix
+
+    async def _reject(self, send, retry_after: float):
+        body = orjson.dumps({"detail": "Too many analysis jobs from this client."})
+        await send({"type": "http.response.start", "status": 429, "headers": [
+            (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()), (b"x-admission", RATE_LIMITED.encode()),
+        ]})
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "POST" and scope["path"].startswith(self.jobs_prefix):
+            decision, retry_after = self.admission.limit(client_id(scope))
+            if decision != ADMITTED:
+                logger.info(f"Rejecting {scope['path']} ({decision})")
+                await self._reject(send, retry_after)
+                return
+            await self.app(scope, receive, send)
+            return
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        if query.get("mode") == ["fast"]:
+            # Local-only analyses are already the degraded path.
+            await self.app(scope, receive, send)
+            return
+        decision, retry_after = self.admission.acquire(client_id(scope))
+        scope.setdefault("state", {})["admission"] = (decision, retry_after)
+        if decision != ADMITTED:
+            logger.info(f"Shedding {scope['path']} ({decision})")
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.admission.release()
+
+
+def shed_decision(state) -> Optional[Tuple[str, int]]:
+    decision, retry_after = getattr(state, "admission", (ADMITTED, 0.0))
+    if decision == ADMITTED:
+        return None
+    return decision, max(1, math.ceil(retry_after))
@@ -0,0 +1,152 @@
+from types import SimpleNamespace
+from typing import Dict, Optional
+import asyncio
+import json
+import random
+
+# Reply bodies per analysis, roughly the size real models produce.
+DEV_REPLY = {
+    "summary": "Solid intermediate developer with consistent Python and TypeScript work across several small services. " * 2,
+    "skill_level": "intermediate",
+    "top_languages": ["Python", "TypeScript", "Go"],
+    "strengths": ["Clear project structure", "Consistent commit history", "Good use of type hints"],
+    "improvement_areas": ["Automated testing", "Documentation depth", "CI coverage"],
+    "recommended_goals": [
+        {"title": "Add tests to the API service", "category": "Testing", "description": "Cover the request handlers with pytest.", "timeline": "2-4 weeks"},
+        {"title": "Ship a CLI tool", "category": "Projects", "description": "Package a small tool and publish it.", "timeline": "1-2 months"},
+    ],
+    "learning_path": ["pytest fixtures", "GitHub Actions", "Packaging", "Profiling"],
+    "estimated_hours": 40,
+    "motivation_message": "You already ship working software; tightening tests and docs will make it shine.",
+    "project_complexity": {"overall": 55, "technicalDebt": 35, "architecture": 60, "scalability": 50, "reasoning": "Small services with clear boundaries."},
+    "coding_patterns": {"consistency": 70, "velocity": 60, "quality": 65, "patterns": ["Feature branches"], "confidence": 0.6},
+}
+REPO_REPLY = {
+    "summary": "A compact, readable service with a clear entry point but thin tests and documentation.",
+    "strengths": ["Readable module layout", "Small focused functions"],
+    "improvement_areas": ["Few tests", "README lacks setup steps"],
+    "code_quality_score": 68,
+    "popularity_score": 40,
+    "documentation_score": 45,
+    "recommendations": ["Add integration tests", "Document configuration", "Set up CI"],
+}
+GOAL_REPLY = {
+    "suggestions": ["Build one small endpoint end to end", "Write a test before each fix", "Read the framework's tutorial chapter on dependencies"],
+    "next_steps": ["Set up the project skeleton", "Add a first route with validation", "Deploy to a free tier"],
+    "estimated_time": "2 weeks",
+    "resources": ["Official documentation", "Real Python tutorials", "Framework examples repo"],
+}
+REPO_NOTE = {"summary": "Small, readable service; tests are thin.", "strengths": ["Clear layout"], "improvement_areas": ["Few tests"]}
+NOTES_MARKER = "Include one repo_notes entry for each of these repositories: "
+SUMMARY_REPLY = "The user set up the project, added routing and asked about testing; advice so far covered fixtures and CI."
+
+SHAPES = ("valid", "wrapped", "trailing_comma", "truncated", "missing_fields", "garbage")
+
+
+def reply_for(prompt: str) -> Optional[dict]:
+    if "You keep a running summary" in prompt:
+        return None
+    if "learning mentor" in prompt:
+        return GOAL_REPLY
+    if "open-source reviewer" in prompt:
+        return REPO_REPLY
+    if NOTES_MARKER in prompt:
+        names = prompt.split(NOTES_MARKER, 1)[1].split(".\n", 1)[0].split(", ")
+        return {**DEV_REPLY, "repo_notes": {name: REPO_NOTE for name in names}}
+    return DEV_REPLY
+
+
+def render(reply: Optional[dict], shape: str, rng: random.Random) -> str:
+    if reply is None:
+        return SUMMARY_REPLY if shape != "garbage" else ""
+    text = json.dumps(reply, indent=2)
+    if shape == "wrapped":
+        return f"Sure! Here is the analysis you asked for:\n```json\n{text}\n```\nLet me know if you need more."
+    if shape == "trailing_comma":
+        return text.replace("]", ",]").replace("\n}", ",\n}")
+    if shape == "truncated":
+        return text[:rng.randint(len(text) // 3, len(text) - 2)]
+    if shape == "missing_fields":
+        keys = list(reply)
+        kept = {key: reply[key] for key in keys if rng.random() > 0.4} or {keys[0]: reply[keys[0]]}
+        return json.dumps(kept)
+    if shape == "garbage":
+        return "I'm sorry, I can't help with that right now."
+    return text
+
+
+class LatencyModel:
+    """Parses "fixed:S", "uniform:LOW:HIGH" or "lognormal:MEDIAN:SIGMA" (seconds)."""
+
+    def __init__(self, spec: str):
+        kind, *args = spec.split(":")
+        self.kind = kind
+        self.args = [float(arg) for arg in args]
+        if kind not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"Unknown latency model {spec!r}")
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            return self.args[0]
+        if self.kind == "uniform":
+            return rng.uniform(self.args[0], self.args[1])
+        median, sigma = self.args
+        return rng.lognormvariate(0, sigma) * median
+
+
+def parse_shapes(spec: str) -> Dict[str, float]:
+    weights = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        if name.strip() not in SHAPES:
+            raise ValueError(f"Unknown output shape {name!r}, expected one of {', '.join(SHAPES)}")
+        weights[name.strip()] = float(weight or 1)
+    return weights or {"valid": 1.0}
+
+
+class FakeLLMClient:
+    """Stands in for g4f's AsyncClient: client.chat.completions.create(...), streaming or not."""
+
+    def __init__(self, latency: str = "lognormal:0.8:0.5", failure_rate: float = 0.0, shapes: str = "valid=1", seed: int = 0, stream_chunk: int = 8):
+        self.latency = LatencyModel(latency)
+        self.failure_rate = failure_rate
+        self.shapes = parse_shapes(shapes)
+        self.rng = random.Random(seed)
+        self.stream_chunk = stream_chunk
+        self.calls = 0
+        self.failures = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def _draw(self, prompt: str):
+        self.calls += 1
+        delay = self.latency.sample(self.rng)
+        fail = self.rng.random() < self.failure_rate
+        shape = self.rng.choices(list(self.shapes), weights=list(self.shapes.values()))[0]
+        return delay, fail, render(reply_for(prompt), shape, self.rng)
+
+    def create(self, model: str, messages: list, stream: bool = False, **kwargs):
+        delay, fail, content = self._draw(messages[-1]["content"])
+        if stream:
+            return self._stream(delay, fail, content)
+        return self._complete(delay, fail, content)
+
+    async def _complete(self, delay: float, fail: bool, content: str):
+        await asyncio.sleep(delay)
+        if fail:
+            self.failures += 1
+            raise RuntimeError("Fake provider error")
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    async def _stream(self, delay: float, fail: bool, content: str):
+        # Time to first token is most of the latency; the rest trickles out with the chunks.
+        await asyncio.sleep(delay * 0.3)
+        if fail:
+            self.failures += 1
+            raise RuntimeError("Fake provider error")
+        chunks = [content[i:i + self.stream_chunk] for i in range(0, len(content), self.stream_chunk)] or [""]
+        pause = delay * 0.7 / len(chunks)
+        for chunk in chunks:
+            await asyncio.sleep(pause)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=chunk))])
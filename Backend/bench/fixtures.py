@@ -0,0 +1,144 @@
+from typing import Callable, Dict, List
+import random
+
+DIRS = ["src", "src/api", "src/core", "src/utils", "tests", "docs", "scripts", "assets/img", "config", "src/components/ui"]
+EXTENSIONS = ["py", "ts", "tsx", "js", "md", "json", "yml", "png", "go", "css"]
+LANGUAGES = ["Python", "TypeScript", "JavaScript", "Go", "Shell", "CSS"]
+COMMITS = [
+    "feat: add login flow", "fix: handle empty payloads", "docs: expand setup section", "refactor: split service module",
+    "update", "wip", "chore(deps): bump httpx", "test: cover error paths", "fix typo", "perf: cache parsed trees",
+]
+CODE = '''import os
+import json
+
+
+class Config:
+    def __init__(self, path):
+        self.path = path
+        self.values = {}
+
+    def load(self):
+        with open(self.path) as f:
+            self.values = json.load(f)
+        return self.values
+
+
+def main():
+    config = Config(os.environ.get("APP_CONFIG", "config.json"))
+    print(config.load())
+'''
+
+
+def make_tree(rng: random.Random, entries: int) -> List[dict]:
+    tree = [{"path": d, "type": "tree"} for d in DIRS]
+    for i in range(max(0, entries - len(tree))):
+        directory = rng.choice(DIRS)
+        tree.append({"path": f"{directory}/file_{i}.{rng.choice(EXTENSIONS)}", "type": "blob", "size": int(rng.lognormvariate(8, 1.5))})
+    tree.append({"path": "README.md", "type": "blob", "size": 4200})
+    return tree
+
+
+def make_readme(rng: random.Random, chars: int) -> str:
+    paragraph = "This project tracks learning goals and analyses GitHub activity to suggest next steps. "
+    return "# Project\n\n" + (paragraph * (chars // len(paragraph) + 1))[:chars]
+
+
+def make_repo_summary(rng: random.Random, index: int, tree_entries: int) -> dict:
+    return {
+        "name": f"repo-{index}",
+        "readme": make_readme(rng, rng.randint(500, 8000)),
+        "code": CODE * rng.randint(1, 6),
+        "tree": make_tree(rng, tree_entries),
+        "stars": rng.randint(0, 500),
+        "forks": rng.randint(0, 80),
+        "topics": rng.sample(["api", "cli", "web", "ml", "devtools", "mobile"], 2),
+        "languages": {lang: rng.randint(1_000, 200_000) for lang in rng.sample(LANGUAGES, 3)},
+        "commit_messages": [rng.choice(COMMITS) for _ in range(rng.randint(20, 100))],
+    }
+
+
+def dev_profile_request(rng: random.Random, variant: int, repos: int = 5, tree_entries: int = 3000) -> dict:
+    return {
+        "username": f"bench-user-{variant}",
+        "profile": {"login": f"bench-user-{variant}", "bio": "Backend developer learning mobile.", "public_repos": 42, "followers": 17},
+        "profile_readme": make_readme(rng, 1500),
+        "repos": [make_repo_summary(rng, i, tree_entries) for i in range(repos)],
+    }
+
+
+def repo_request(rng: random.Random, variant: int, tree_entries: int = 20000) -> dict:
+    summary = make_repo_summary(rng, variant, tree_entries)
+    return {
+        "username": "bench-user",
+        "repo_name": f"bench-repo-{variant}",
+        "readme_content": summary["readme"],
+        "commit_messages": summary["commit_messages"],
+        "repo_languages": summary["languages"],
+        "stars": summary["stars"],
+        "forks": summary["forks"],
+        "topics": summary["topics"],
+        "size": 2048,
+        "code": summary["code"],
+        "tree": summary["tree"],
+    }
+
+
+def repo_batch_request(rng: random.Random, variant: int, repos: int = 10, tree_entries: int = 2000) -> dict:
+    return {"repos": [repo_request(rng, variant * 1000 + i, tree_entries) for i in range(repos)]}
+
+
+def goal_request(rng: random.Random, variant: int, history_turns: int = 60) -> dict:
+    history = []
+    for i in range(history_turns):
+        if i % 2 == 0:
+            history.append({"role": "user", "message": f"Progress update {i}: finished the chapter on routing and wrote two endpoints. " * 2})
+        else:
+            history.append({"role": "ai", "message": "Suggestions: add tests; read about dependency injection\nNext Steps: write a fixture; deploy\nEstimated Time: 1 week"})
+    return {
+        "goal_title": "Learn FastAPI",
+        "category": "Backend",
+        "current_progress": f"Variant {variant}: added JWT auth and a first integration test.",
+        "description": "Build and deploy a small REST API.",
+        "chat_history": history,
+    }
+
+
+FIXTURES: Dict[str, Callable[[random.Random, int], dict]] = {
+    "dev-profile": dev_profile_request,
+    "repo": repo_request,
+    "repos": repo_batch_request,
+    "goal": goal_request,
+}
+
+PATHS = {
+    "dev-profile": "/analyze-dev-profile",
+    "repo": "/analyze-repo",
+    "repos": "/analyze-repos",
+    "goal": "/analyze-goal",
+}
+
+
+def compact_tree(tree: List[dict]) -> dict:
+    return {
+        "path": [entry["path"] for entry in tree],
+        "type": ["t" if entry.get("type") == "tree" else "b" for entry in tree],
+        "size": [entry.get("size") for entry in tree],
+    }
+
+
+def compact_trees(payload):
+    # Rewrites every "tree" list in a payload to the columnar wire form.
+    if isinstance(payload, dict):
+        return {
+            key: compact_tree(value) if key == "tree" and isinstance(value, list) else compact_trees(value)
+            for key, value in payload.items()
+        }
+    if isinstance(payload, list):
+        return [compact_trees(item) for item in payload]
+    return payload
+
+
+def build_payloads(endpoint: str, distinct: int, seed: int = 0, compact: bool = False) -> List[dict]:
+    rng = random.Random(seed)
+    payloads = [FIXTURES[endpoint](rng, variant) for variant in range(distinct)]
+    return [compact_trees(payload) for payload in payloads] if compact else payloads
@@ -0,0 +1,183 @@
+"""Checks LLMRouter hedging, circuit breakers and deadlines against stub providers.
+
+Each scenario drives the router with scripted providers (fixed latencies and failures,
+no network) and asserts what reached them. Exits non-zero if any scenario fails.
+
+    python bench/router_check.py
+"""
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, List
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Short windows so the scenarios run in about a second; set before router reads them.
+os.environ.setdefault("LLM_HEDGE_MIN_SAMPLES", "5")
+os.environ.setdefault("LLM_BREAKER_MIN_CALLS", "5")
+os.environ.setdefault("LLM_BREAKER_COOLDOWN", "0.2")
+
+from llm import LLMClient  # noqa: E402
+from router import LLM_BREAKER_COOLDOWN, LLM_BREAKER_MIN_CALLS, LLM_HEDGE_MIN_SAMPLES, CLOSED, OPEN, LLMRouter, NoRouteAvailable, Route  # noqa: E402
+
+
+class StubProvider:
+    """Answers like g4f's client after `latency(call)` seconds, or raises when `fails(call)` is true."""
+
+    def __init__(self, latency: Callable[[int], float] = lambda call: 0.01, fails: Callable[[int], bool] = lambda call: False):
+        self.latency = latency
+        self.fails = fails
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        call = self.calls
+        self.calls += 1
+        if kwargs.get("stream"):
+            return self._stream(call)
+        return self._complete(call, kwargs["model"])
+
+    async def _complete(self, call: int, model: str):
+        await asyncio.sleep(self.latency(call))
+        if self.fails(call):
+            raise RuntimeError(f"stub failure on call {call}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=f"ok from {model}"))])
+
+    async def _stream(self, call: int):
+        await asyncio.sleep(self.latency(call))
+        if self.fails(call):
+            raise RuntimeError(f"stub failure on call {call}")
+        for token in ("a", "b", "c"):
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
+
+
+async def warm(router: LLMRouter, calls: int = LLM_HEDGE_MIN_SAMPLES):
+    for _ in range(calls):
+        await router.complete("x", "goal", 10, 0.1)
+
+
+async def open_breaker(route: Route):
+    # Enough failures to trip it, then wait out the cooldown so the next call is the half-open probe.
+    for _ in range(LLM_BREAKER_MIN_CALLS):
+        route.record("goal", 0.01, False)
+    assert route.state == OPEN, route.state
+    await asyncio.sleep(LLM_BREAKER_COOLDOWN + 0.05)
+
+
+async def hedge_on_slow_call():
+    # Every call after the warm-up is slow on the primary; the hedge on the secondary answers instead.
+    slow = StubProvider(latency=lambda call: 2.0 if call >= LLM_HEDGE_MIN_SAMPLES else 0.01)
+    fast = StubProvider()
+    router = LLMRouter([Route(slow, "primary"), Route(fast, "secondary")], deadlines={"goal": 1.0})
+    await warm(router)
+    start = time.monotonic()
+    content = await router.complete("x", "goal", 10, 0.1)
+    elapsed = time.monotonic() - start
+    assert content == "ok from secondary", content
+    assert elapsed < 0.5, elapsed
+    assert (router.hedges, router.hedge_wins) == (1, 1), router.stats()
+
+
+async def hedge_needs_a_free_slot():
+    # A hedge holds a concurrency slot of its own; with the only slot taken by the first attempt none is sent.
+    for limit, hedges in ((1, 0), (2, 1)):
+        slow = StubProvider(latency=lambda call: 0.3 if call >= LLM_HEDGE_MIN_SAMPLES else 0.01)
+        router = LLMRouter([Route(slow, "primary"), Route(StubProvider(), "secondary")], deadlines={"goal": 1.0})
+        llm = LLMClient(client=slow, max_concurrency=limit, router=router)
+        await warm(router)
+        await llm.complete("x", "goal", 10, 0.1)
+        assert router.hedges == hedges, (limit, router.stats())
+        assert llm.in_flight["goal"] == 0 and not llm._global.locked(), llm.stats()
+
+
+async def breaker_skips_failing_route():
+    dead = StubProvider(fails=lambda call: True)
+    ok = StubProvider()
+    router = LLMRouter([Route(dead, "dead"), Route(ok, "ok")])
+    for _ in range(LLM_BREAKER_MIN_CALLS * 2):
+        assert await router.complete("x", "repo", 10, 0.1) == "ok from ok"
+    assert dead.calls == LLM_BREAKER_MIN_CALLS, dead.calls
+    assert router.routes[0].state == OPEN
+
+
+async def half_open_allows_one_probe():
+    # Concurrent calls after the cooldown: only one reaches the recovering provider, the rest are refused.
+    provider = StubProvider(latency=lambda call: 0.1)
+    route = Route(provider, "only")
+    router = LLMRouter([route])
+    await open_breaker(route)
+    results = await asyncio.gather(*[router.complete("x", "goal", 10, 0.1) for _ in range(5)], return_exceptions=True)
+    assert provider.calls == 1, provider.calls
+    assert sum(isinstance(result, NoRouteAvailable) for result in results) == 4, results
+    assert route.state == CLOSED, route.state
+
+
+async def half_open_probe_is_not_hedged():
+    # A single route's hedge goes to the same route, which must not send a second probe while half-open.
+    provider = StubProvider(latency=lambda call: 0.3 if call >= LLM_HEDGE_MIN_SAMPLES else 0.01)
+    route = Route(provider, "only")
+    router = LLMRouter([route], deadlines={"goal": 1.0})
+    await warm(router)
+    await open_breaker(route)
+    assert await router.complete("x", "goal", 10, 0.1) == "ok from only"
+    assert provider.calls == LLM_HEDGE_MIN_SAMPLES + 1, provider.calls
+    assert router.hedges == 0, router.stats()
+
+
+async def deadline_stops_hanging_call():
+    router = LLMRouter([Route(StubProvider(latency=lambda call: 10.0), "hang")], deadlines={"goal": 0.2})
+    start = time.monotonic()
+    try:
+        await router.complete("x", "goal", 10, 0.1)
+    except asyncio.TimeoutError:
+        pass
+    else:
+        raise AssertionError("expected a timeout")
+    assert time.monotonic() - start < 0.4
+    assert router.timeouts == 1, router.stats()
+
+
+async def stream_fails_over_before_first_token():
+    dead = StubProvider(fails=lambda call: True)
+    router = LLMRouter([Route(dead, "dead"), Route(StubProvider(), "ok")])
+    tokens = [token async for token in router.stream("x", "goal", 10, 0.1)]
+    assert tokens == ["a", "b", "c"], tokens
+    assert dead.calls == 1, dead.calls
+
+
+SCENARIOS = [
+    hedge_on_slow_call,
+    hedge_needs_a_free_slot,
+    breaker_skips_failing_route,
+    half_open_allows_one_probe,
+    half_open_probe_is_not_hedged,
+    deadline_stops_hanging_call,
+    stream_fails_over_before_first_token,
+]
+
+
+async def run() -> List[str]:
+    failed = []
+    for scenario in SCENARIOS:
+        try:
+            await scenario()
+            print(f"ok   {scenario.__name__}")
+        except Exception as e:
+            failed.append(scenario.__name__)
+            print(f"FAIL {scenario.__name__}: {e!r}")
+    return failed
+
+
+def main():
+    logging.basicConfig(level=logging.ERROR)
+    failed = asyncio.run(run())
+    print(f"{len(SCENARIOS) - len(failed)}/{len(SCENARIOS)} router scenarios passed")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""Offline load test for the analysis endpoints.
+
+Runs the FastAPI app in-process over an ASGI transport with a fake LLM client,
+so results depend only on this code and the chosen latency/failure model.
+
+    python bench/run.py --endpoint repo --concurrency 1,8,32,128 --requests 400
+    python bench/run.py --endpoint goal --latency lognormal:0.8:0.6 --shapes valid=8,wrapped=1,truncated=1 --output goal.json
+"""
+from pathlib import Path
+from typing import List, Optional
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(BACKEND), str(Path(__file__).resolve().parent)]
+
+# Keep benchmark state away from the real databases before main is imported.
+_state_dir = tempfile.mkdtemp(prefix="devtracker-bench-")
+os.environ.setdefault("CONVERSATION_DB", os.path.join(_state_dir, "conversations.db"))
+os.environ.setdefault("FRAGMENT_DB", os.path.join(_state_dir, "fragments.db"))
+os.environ["RESPONSE_CACHE_DB"] = ""
+# Every benchmark request comes from one client; per-client rate limiting would shed nearly all of them.
+os.environ.setdefault("RATE_LIMIT_RATE", "0")
+
+import httpx  # noqa: E402
+import main  # noqa: E402
+from cache import ResponseCache  # noqa: E402
+from conversations import ConversationStore  # noqa: E402
+from fragments import FragmentStore  # noqa: E402
+from llm import LLMClient  # noqa: E402
+from fake_llm import FakeLLMClient  # noqa: E402
+from fixtures import PATHS, build_payloads  # noqa: E402
+from similarity import SimilarityIndex  # noqa: E402
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        import resource
+        # ru_maxrss is the peak, in KiB on Linux and bytes on macOS.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (2**20 if sys.platform == "darwin" else 2**10)
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def response_sources(body: bytes, stream: bool, batch: bool = False) -> List[str]:
+    try:
+        if stream and batch:
+            # Batch streams are NDJSON, one finished repo per line.
+            data = {"results": [json.loads(line) for line in body.splitlines() if line.strip()]}
+        elif stream:
+            # Only the final SSE "done" event carries the full response.
+            done = body.rsplit(b"event: done\ndata: ", 1)[-1].split(b"\n\n", 1)[0]
+            data = json.loads(done)
+        else:
+            data = json.loads(body)
+    except ValueError:
+        return ["invalid"]
+    if "results" in data:
+        return [item["analysis"].get("source", "ai") for item in data["results"]]
+    return [data.get("source", "ai")]
+
+
+async def run_level(args, payloads: List[bytes], concurrency: int) -> dict:
+    # Every level starts cold: no cached analyses, repo notes, similar goals or stored chats from the last one.
+    level_dir = tempfile.mkdtemp(dir=_state_dir)
+    main.response_cache = ResponseCache()
+    main.fragments = FragmentStore(db_path=os.path.join(level_dir, "fragments.db"))
+    main.similar_goals = SimilarityIndex()
+    main.conversations = ConversationStore(os.path.join(level_dir, "conversations.db"))
+    fake = FakeLLMClient(args.latency, args.failure_rate, args.shapes, seed=args.seed)
+    main.llm = LLMClient(client=fake)
+    params = {}
+    headers = {"Content-Type": "application/json", "Accept-Encoding": "gzip" if args.gzip else "identity"}
+    if args.gzip:
+        headers["Content-Encoding"] = "gzip"
+    if args.stream:
+        params["stream"] = "true"
+    if args.mode:
+        params["mode"] = args.mode
+    path = PATHS[args.endpoint]
+    latencies: List[float] = []
+    sources: dict = {}
+    errors = 0
+    next_index = 0
+
+    if args.trace_memory:
+        tracemalloc.reset_peak()
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def worker():
+            nonlocal next_index, errors
+            while next_index < args.requests:
+                payload = payloads[next_index % len(payloads)]
+                next_index += 1
+                start = time.perf_counter()
+                try:
+                    response = await client.post(path, params=params, content=payload, headers=headers)
+                    ok = response.status_code == 200
+                except Exception:
+                    ok = False
+                latencies.append(time.perf_counter() - start)
+                if not ok:
+                    errors += 1
+                    continue
+                for source in response_sources(response.content, args.stream, args.endpoint == "repos"):
+                    sources[source] = sources.get(source, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    result = {
+        "endpoint": args.endpoint,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "max_ms": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+        "llm_calls": fake.calls,
+        "sources": sources,
+        "request_bytes": sum(len(payload) for payload in payloads) // len(payloads),
+        "rss_mb": round(rss_mb(), 1),
+    }
+    if args.trace_memory:
+        result["peak_traced_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+    return result
+
+
+def print_table(results: List[dict]):
+    columns = ["concurrency", "requests", "errors", "rps", "p50_ms", "p95_ms", "p99_ms", "max_ms", "llm_calls", "request_bytes", "rss_mb"]
+    if results and "peak_traced_mb" in results[0]:
+        columns.append("peak_traced_mb")
+    print(" ".join(f"{name:>14}" for name in columns) + "  sources")
+    for result in results:
+        print(" ".join(f"{result[name]:>14}" for name in columns) + f"  {result['sources']}")
+
+
+async def run(args) -> List[dict]:
+    distinct = args.distinct or args.requests
+    payloads = [json.dumps(payload).encode("utf-8") for payload in build_payloads(args.endpoint, distinct, args.seed, args.compact_tree)]
+    if args.gzip:
+        payloads = [gzip.compress(payload, compresslevel=6) for payload in payloads]
+    results = []
+    async with main.lifespan(main.app):
+        for concurrency in args.concurrency:
+            result = await run_level(args, payloads, concurrency)
+            results.append(result)
+            if not args.quiet:
+                print(f"concurrency {concurrency}: {result['rps']} rps, p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms", file=sys.stderr)
+    return results
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Offline benchmark for the DevTracker backend.")
+    parser.add_argument("--endpoint", choices=sorted(PATHS), default="repo")
+    parser.add_argument("--concurrency", type=lambda s: [int(c) for c in s.split(",")], default=[1, 8, 32, 128],
+                        help="comma separated concurrency levels (default 1,8,32,128)")
+    parser.add_argument("--requests", type=int, default=200, help="requests per concurrency level")
+    parser.add_argument("--distinct", type=int, default=0,
+                        help="distinct payloads to cycle through; fewer than --requests gives cache hits (default: all distinct)")
+    parser.add_argument("--latency", default="lognormal:0.05:0.5", help="fixed:S, uniform:LOW:HIGH or lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of LLM calls that raise")
+    parser.add_argument("--shapes", default="valid=1",
+                        help="weighted reply shapes: valid, wrapped, trailing_comma, truncated, missing_fields, garbage")
+    parser.add_argument("--stream", action="store_true", help="use ?stream=true")
+    parser.add_argument("--mode", choices=["fast"], help="pass ?mode=fast (no LLM)")
+    parser.add_argument("--compact-tree", action="store_true", help="send trees in the columnar path/type/size form")
+    parser.add_argument("--gzip", action="store_true", help="gzip request bodies and accept gzip responses")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--trace-memory", action="store_true", help="also report tracemalloc peak (slower)")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--quiet", action="store_true")
+    return parser.parse_args(argv)
+
+
+def main_cli(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    # Per-request INFO logs would dominate the measurement.
+    logging.getLogger().setLevel(logging.ERROR if args.quiet else logging.WARNING)
+    if args.trace_memory:
+        tracemalloc.start()
+    results = asyncio.run(run(args))
+    print_table(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,75 @@
+"""Checks the goal similarity index against labelled goal pairs.
+
+Each pair stores one first-turn goal and looks up another in the same category; it
+passes when the lookup hits exactly when the pair is labelled a match. Run it after
+changing the features, the filler lists or SIMILAR_GOAL_THRESHOLD.
+
+    python bench/similar_goals.py
+    python bench/similar_goals.py --threshold 0.8
+"""
+from pathlib import Path
+from typing import NamedTuple, Optional
+import argparse
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from similarity import SIMILAR_GOAL_THRESHOLD, SimilarityIndex, boilerplate, goal_key
+
+
+class Goal(NamedTuple):
+    title: str
+    progress: str = ""
+    description: str = ""
+
+
+# (stored, looked up, should match)
+PAIRS = [
+    (Goal("Learn React hooks", "Just started"), Goal("Learning React Hooks", "I just started"), True),
+    (Goal("Learn React hooks", "Just started"), Goal("React hooks"), True),
+    (Goal("Learn React hooks", "Just started"), Goal("Learn React hooks now", "Nothing yet"), True),
+    (Goal("Learn React hooks"), Goal("learn react hooks", "", ""), True),
+    (Goal("Master Kubernetes", "Deployed a pod to minikube"), Goal("Master Kubernetes", "deployed a pod to minikube"), True),
+    (Goal("Learn FastAPI", "", "Build a REST API for my side project"), Goal("Learning FastAPI", "", "Build a REST API for my side project"), True),
+    (Goal("Learn FastAPI", "", "Build a REST API for my side project"), Goal("FastAPI", "", "Building a REST API for a side project"), True),
+    (Goal("Learn React hooks", "Just started"), Goal("Learn React", "Just started"), False),
+    (Goal("Learn React", "Just started"), Goal("Learn React hooks", "Just started"), False),
+    (Goal("Learn React hooks", "Just started"), Goal("Learn React Native", "Just started"), False),
+    (Goal("Learn React hooks", "Just started"), Goal("Learn Vue", "Just started"), False),
+    (Goal("Learn React hooks", "Just started"), Goal("Learn Redux", "Just started"), False),
+    (Goal("Learn React hooks", "Just started"), Goal("Learn React hooks", "Finished useEffect and useMemo, building a todo app"), False),
+    (Goal("Learn Rust", "Reading the book"), Goal("Learn Rust", "Shipped a CLI tool with clap and serde"), False),
+    (Goal("Learn FastAPI", "", "Build a REST API for my side project"), Goal("Learn FastAPI", "", "Prepare for a backend job interview"), False),
+    (Goal("Learn TypeScript generics", "Basics done"), Goal("Learn TypeScript", "Basics done"), False),
+]
+
+
+def fields(goal: Goal):
+    # Mirrors goal_similarity_fields/goal_similarity_partition in main.py.
+    return [(goal.description, 1.0), ("" if boilerplate(goal.progress) else goal.progress, 1.0)]
+
+
+def check(stored: Goal, query: Goal, threshold: float) -> Optional[float]:
+    index = SimilarityIndex(max_size=8, threshold=threshold)
+    index.add(f"Frontend\n{goal_key(stored.title)}", fields(stored), {"title": stored.title})
+    found = index.lookup(f"Frontend\n{goal_key(query.title)}", fields(query))
+    return found[1] if found else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threshold", type=float, default=SIMILAR_GOAL_THRESHOLD)
+    args = parser.parse_args()
+    failures = 0
+    for stored, query, expected in PAIRS:
+        similarity = check(stored, query, args.threshold)
+        ok = (similarity is not None) == expected
+        failures += not ok
+        score = f"{similarity:.3f}" if similarity is not None else "miss"
+        print(f"{'ok  ' if ok else 'FAIL'} {score:>5}  {query.title!r} / {query.progress or query.description!r} -> {stored.title!r} (expected {'match' if expected else 'miss'})")
+    print(f"{len(PAIRS) - failures}/{len(PAIRS)} pairs as labelled at threshold {args.threshold}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Measures backend start-up in fresh interpreters: import time, memory, first response and readiness.
+
+Each run imports main in a new process, enters the app lifespan, times the first
+request (the OAuth redirect) and polls /ready until it answers 200. Times after
+process_s are measured from just before main is imported.
+
+    python bench/startup.py --runs 5
+    python bench/startup.py --mode eager,background,lazy --importtime 15 --output startup.json
+"""
+from pathlib import Path
+from typing import Dict, List, Optional
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND = Path(__file__).resolve().parent.parent
+METRICS = ["process_s", "import_s", "first_response_s", "ready_s", "rss_import_mb", "rss_ready_mb", "peak_rss_mb", "modules"]
+
+
+def memory() -> Dict[str, float]:
+    try:
+        with open("/proc/self/status") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+        return {"rss_mb": int(fields["VmRSS"].split()[0]) / 1024, "peak_rss_mb": int(fields["VmHWM"].split()[0]) / 1024}
+    except (OSError, KeyError, ValueError):
+        import resource
+        # ru_maxrss is the peak, in KiB on Linux and bytes on macOS.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2**20 if sys.platform == "darwin" else 2**10)
+        return {"rss_mb": peak, "peak_rss_mb": peak}
+
+
+async def serve(main, started: float, timeout: float) -> Dict[str, float]:
+    import httpx
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.lifespan(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://startup") as client:
+            await client.get("/auth/github/login")
+            first = time.perf_counter()
+            ready = None
+            while time.perf_counter() - started < timeout:
+                if (await client.get("/ready")).status_code == 200:
+                    ready = time.perf_counter()
+                    break
+                await asyncio.sleep(0.01)
+        return {"first_response_s": first - started, "ready_s": (ready - started) if ready else float("nan")}
+
+
+def child(timeout: float):
+    start = time.perf_counter()
+    sys.path.insert(0, str(BACKEND))
+    import main
+    result = {"import_s": time.perf_counter() - start, "rss_import_mb": memory()["rss_mb"]}
+    result.update(asyncio.run(serve(main, start, timeout)))
+    after = memory()
+    result.update({"rss_ready_mb": after["rss_mb"], "peak_rss_mb": after["peak_rss_mb"], "modules": len(sys.modules)})
+    print(json.dumps(result))
+
+
+def child_env(mode: str, state_dir: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env["LLM_STARTUP"] = mode
+    env.setdefault("GITHUB_CLIENT_ID", "startup-bench")
+    env["CONVERSATION_DB"] = os.path.join(state_dir, "conversations.db")
+    env["FRAGMENT_DB"] = os.path.join(state_dir, "fragments.db")
+    env["RESPONSE_CACHE_DB"] = ""
+    return env
+
+
+def run_child(args, mode: str, state_dir: str) -> dict:
+    command = [sys.executable, str(Path(__file__).resolve()), "--child", "--timeout", str(args.timeout)]
+    start = time.perf_counter()
+    completed = subprocess.run(command, env=child_env(mode, state_dir), capture_output=True, text=True, cwd=BACKEND)
+    elapsed = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(f"Start-up run failed ({mode}):\n{completed.stderr[-2000:]}")
+    return {"process_s": elapsed, **json.loads(completed.stdout.strip().splitlines()[-1])}
+
+
+def import_profile(mode: str, state_dir: str, top: int) -> List[dict]:
+    # -X importtime lines look like "import time:   self |  cumulative | <indent>module" (microseconds).
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        env=child_env(mode, state_dir), capture_output=True, text=True, cwd=BACKEND
+    )
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|")
+        if not self_us.strip().isdigit():
+            continue
+        depth = (len(name) - len(name.lstrip())) // 2
+        # Depth 1 are main's own imports, which is where a change in this repo shows up.
+        if depth <= 1:
+            rows.append({"module": name.strip(), "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000})
+    return sorted(rows, key=lambda row: -row["cumulative_ms"])[:top]
+
+
+def summarize(mode: str, runs: List[dict]) -> dict:
+    summary = {"mode": mode, "runs": len(runs)}
+    for name in METRICS:
+        values = [run[name] for run in runs]
+        summary[name] = round(statistics.median(values), 3)
+        summary[f"{name}_min"] = round(min(values), 3)
+    return summary
+
+
+def print_table(summaries: List[dict]):
+    columns = ["mode", "runs"] + METRICS
+    print(" ".join(f"{name:>16}" for name in columns))
+    for summary in summaries:
+        print(" ".join(f"{summary[name]:>16}" for name in columns))
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Start-up time and memory of the DevTracker backend.")
+    parser.add_argument("--mode", type=lambda s: s.split(","), default=["background"],
+                        help="comma separated LLM_STARTUP modes: background, lazy, eager (default background)")
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes per mode; medians are reported")
+    parser.add_argument("--timeout", type=float, default=60, help="seconds to wait for /ready")
+    parser.add_argument("--importtime", type=int, default=0, metavar="N", help="also list the N slowest imports of main")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main_cli(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    if args.child:
+        child(args.timeout)
+        return
+    results = {"args": vars(args), "python": sys.version.split()[0], "summaries": [], "runs": {}, "imports": {}}
+    with tempfile.TemporaryDirectory(prefix="devtracker-startup-") as state_dir:
+        for mode in args.mode:
+            runs = [run_child(args, mode, state_dir) for _ in range(args.runs)]
+            results["runs"][mode] = runs
+            results["summaries"].append(summarize(mode, runs))
+            if args.importtime:
+                results["imports"][mode] = import_profile(mode, state_dir, args.importtime)
+    print_table(results["summaries"])
+    for mode, rows in results["imports"].items():
+        print(f"\nslowest imports ({mode}):")
+        for row in rows:
+            print(f"  {row['cumulative_ms']:>9.1f} ms  {row['module']}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
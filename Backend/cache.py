@@ -0,0 +1,154 @@
+from collections import OrderedDict
+from pydantic import BaseModel
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+import orjson
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", "3600"))
+RESPONSE_CACHE_DB = os.environ.get("RESPONSE_CACHE_DB", "")
+
+
+def request_key(namespace: str, request: BaseModel) -> str:
+    normalized = orjson.dumps(request.model_dump(), option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    return hashlib.sha256(namespace.encode("utf-8") + b":" + normalized).hexdigest()
+
+
+class SQLiteTier:
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        """Returns the stored value and its expiry time, or None if missing or expired."""
+        row = self._conn.execute("SELECT value, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if not row:
+            return None
+        if row[1] < time.time():
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._conn.commit()
+            return None
+        return row[0], row[1]
+
+    def set(self, key: str, value: str, expires_at: float):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, expires_at)
+        )
+        self._conn.commit()
+
+
+class ResponseCache:
+    def __init__(self, max_size: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL, db_path: str = RESPONSE_CACHE_DB):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[str, int] = {}
+        self.disk = SQLiteTier(db_path) if db_path else None
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _get_memory(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _set_memory(self, key: str, value: str, expires_at: float):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[dict]:
+        value = self._get_memory(key)
+        if value is None and self.disk is not None:
+            stored = None
+            try:
+                stored = await asyncio.to_thread(self.disk.get, key)
+            except Exception as e:
+                logger.warning(f"Response cache disk read failed: {e}")
+            if stored is not None:
+                # Promoted with its stored expiry: a disk hit does not earn a fresh TTL.
+                value, expires_at = stored
+                self._set_memory(key, value, expires_at)
+        return orjson.loads(value) if value is not None else None
+
+    async def set(self, key: str, result: dict):
+        value = orjson.dumps(result).decode("utf-8")
+        expires_at = time.time() + self.ttl
+        self._set_memory(key, value, expires_at)
+        if self.disk is not None:
+            try:
+                await asyncio.to_thread(self.disk.set, key, value, expires_at)
+            except Exception as e:
+                logger.warning(f"Response cache disk write failed: {e}")
+
+    async def _compute_and_store(self, key: str, compute: Callable[[], Awaitable[dict]]) -> dict:
+        try:
+            result = await compute()
+            if isinstance(result, dict) and result.get("ai_success", True):
+                await self.set(key, result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _wait(self, key: str, task: asyncio.Task) -> dict:
+        # The computation is shared, so it is only cancelled once every caller waiting on it has gone away.
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            return dict(await asyncio.shield(task))
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+                if not task.done():
+                    task.cancel()
+
+    async def get_or_compute(self, namespace: str, request: BaseModel, compute: Callable[[], Awaitable[dict]]) -> dict:
+        key = request_key(namespace, request)
+        cached = await self.get(key)
+        if cached is not None:
+            self.hits += 1
+            cached["source"] = "cache"
+            return cached
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            result = await self._wait(key, task)
+            if result.get("ai_success", True):
+                result["source"] = "cache"
+            return result
+        self.misses += 1
+        task = asyncio.ensure_future(self._compute_and_store(key, compute))
+        self._inflight[key] = task
+        return await self._wait(key, task)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "disk": self.disk.path if self.disk else None,
+        }
@@ -0,0 +1,142 @@
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+import weakref
+
+logger = logging.getLogger(__name__)
+
+CONVERSATION_DB = os.environ.get("CONVERSATION_DB", "conversations.db")
+CONVERSATION_KEEP_TURNS = int(os.environ.get("CONVERSATION_KEEP_TURNS", "6"))
+CONVERSATION_FOLD_BATCH = int(os.environ.get("CONVERSATION_FOLD_BATCH", "4"))
+CONVERSATION_SUMMARY_CHARS = int(os.environ.get("CONVERSATION_SUMMARY_CHARS", "1200"))
+
+Summarizer = Callable[[str, List[dict]], Awaitable[Optional[str]]]
+
+
+def format_ai_turn(result: dict) -> str:
+    # Same shape the mobile client stores for AI turns in goal chats.
+    parts = []
+    if result.get("suggestions"):
+        parts.append("Suggestions: " + "; ".join(result["suggestions"]))
+    if result.get("next_steps"):
+        parts.append("Next Steps: " + "; ".join(result["next_steps"]))
+    if result.get("estimated_time"):
+        parts.append("Estimated Time: " + result["estimated_time"])
+    if result.get("resources"):
+        parts.append("Resources: " + "; ".join(result["resources"]))
+    return "\n".join(parts)
+
+
+def build_summary_prompt(goal_title: str, summary: str, turns: List[dict]) -> str:
+    lines = "\n".join(f"{'User' if turn.get('role') == 'user' else 'AI'}: {turn.get('message', '')}" for turn in turns)
+    return (
+        f"You keep a running summary of a mentoring chat about the learning goal \"{goal_title}\".\n\n"
+        f"Current summary:\n{summary or '(empty)'}\n\n"
+        f"Older turns to fold into the summary:\n{lines}\n\n"
+        "Reply with ONLY the updated summary as plain text, at most 120 words. "
+        "Keep what the user has already done, advice already given, and open questions."
+    )
+
+
+def conversation_key(goal_id: str, token: Optional[str] = None) -> str:
+    """Scopes a goal_id to its owner: the client's token (hashed, never stored), or else an unguessable UUID goal_id."""
+    # The app derives goal ids from Date.now(), so a bare id would let two users share, or read, one chat.
+    if token:
+        return "token:" + hashlib.sha256(token.encode("utf-8")).hexdigest()[:32] + ":" + goal_id
+    try:
+        return "uuid:" + str(uuid.UUID(goal_id))
+    except ValueError:
+        raise ValueError("goal_id must be a UUID unless the request carries an Authorization token.") from None
+
+
+def fold_locally(summary: str, turns: List[dict]) -> str:
+    folded = " ".join(
+        f"{'User' if turn.get('role') == 'user' else 'AI'}: {turn.get('message', '')[:160]}" for turn in turns
+    )
+    merged = f"{summary} {folded}".strip()
+    return merged[-CONVERSATION_SUMMARY_CHARS:]
+
+
+class ConversationStore:
+    def __init__(self, path: str = CONVERSATION_DB, keep_turns: int = CONVERSATION_KEEP_TURNS, fold_batch: int = CONVERSATION_FOLD_BATCH):
+        self.path = path
+        self.keep_turns = keep_turns
+        self.fold_batch = fold_batch
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS conversations ("
+            "goal_id TEXT PRIMARY KEY, summary TEXT NOT NULL, turns TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        # Weak values: a lock lives only while someone holds or waits on it, so one per chat ever seen is not kept.
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self._folding: Dict[str, asyncio.Task] = {}
+
+    def _lock(self, goal_id: str) -> asyncio.Lock:
+        lock = self._locks.get(goal_id)
+        if lock is None:
+            lock = self._locks[goal_id] = asyncio.Lock()
+        return lock
+
+    def _load(self, goal_id: str) -> Optional[Tuple[str, List[dict]]]:
+        row = self._conn.execute("SELECT summary, turns FROM conversations WHERE goal_id = ?", (goal_id,)).fetchone()
+        if not row:
+            return None
+        return row[0], json.loads(row[1])
+
+    def _save(self, goal_id: str, summary: str, turns: List[dict]):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO conversations (goal_id, summary, turns, updated_at) VALUES (?, ?, ?, ?)",
+            (goal_id, summary, json.dumps(turns), time.time())
+        )
+        self._conn.commit()
+
+    async def load(self, goal_id: str, seed: Optional[list] = None) -> Tuple[str, List[dict]]:
+        async with self._lock(goal_id):
+            state = await asyncio.to_thread(self._load, goal_id)
+            if state is not None:
+                return state
+            # First call for this goal: adopt whatever history the client still holds.
+            turns = [
+                {"role": turn.get("role", "user"), "message": turn.get("message", "")}
+                for turn in (seed or []) if isinstance(turn, dict)
+            ]
+            await asyncio.to_thread(self._save, goal_id, "", turns)
+            return "", turns
+
+    async def append(self, goal_id: str, new_turns: List[dict], summarize: Summarizer):
+        async with self._lock(goal_id):
+            summary, turns = await asyncio.to_thread(self._load, goal_id) or ("", [])
+            turns = turns + new_turns
+            await asyncio.to_thread(self._save, goal_id, summary, turns)
+        # Folding is batched and runs off the request path; until it lands the
+        # prompt carries at most keep_turns + fold_batch verbatim turns.
+        if len(turns) >= self.keep_turns + self.fold_batch and goal_id not in self._folding:
+            self._folding[goal_id] = asyncio.ensure_future(self._fold(goal_id, summarize))
+
+    async def _fold(self, goal_id: str, summarize: Summarizer):
+        try:
+            async with self._lock(goal_id):
+                summary, turns = await asyncio.to_thread(self._load, goal_id) or ("", [])
+            overflow = turns[:-self.keep_turns]
+            if not overflow:
+                return
+            # The LLM call happens outside the lock so new turns can still be appended meanwhile.
+            try:
+                new_summary = await summarize(summary, overflow)
+            except Exception as e:
+                logger.warning(f"Conversation summary for {goal_id} failed, folding locally: {e}")
+                new_summary = None
+            new_summary = (new_summary or "").strip()[:CONVERSATION_SUMMARY_CHARS] or fold_locally(summary, overflow)
+            async with self._lock(goal_id):
+                _, turns = await asyncio.to_thread(self._load, goal_id) or ("", [])
+                await asyncio.to_thread(self._save, goal_id, new_summary, turns[len(overflow):])
+        finally:
+            self._folding.pop(goal_id, None)
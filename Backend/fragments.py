@@ -0,0 +1,77 @@
+from cache import ResponseCache
+from typing import Dict, Iterable, Optional, Tuple
+import hashlib
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+FRAGMENT_CACHE_SIZE = int(os.environ.get("FRAGMENT_CACHE_SIZE", "4096"))
+FRAGMENT_CACHE_TTL = float(os.environ.get("FRAGMENT_CACHE_TTL", str(30 * 24 * 3600)))
+FRAGMENT_DB = os.environ.get("FRAGMENT_DB", "fragments.db")
+FRAGMENT_LIST_ITEMS = 5
+
+
+def fragment_key(owner: str, repo: str, sha: str) -> str:
+    return hashlib.sha256(f"repo-fragment:{owner.lower()}/{repo.lower()}@{sha}".encode("utf-8")).hexdigest()
+
+
+def _items(value) -> list:
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list):
+        return []
+    return [str(item).strip() for item in value if item and str(item).strip()][:FRAGMENT_LIST_ITEMS]
+
+
+def clean_note(note) -> Optional[dict]:
+    """Keeps the per-repo part of an analysis that a later profile analysis can reuse."""
+    if not isinstance(note, dict):
+        return None
+    summary = note.get("summary")
+    if not isinstance(summary, str) or not summary.strip():
+        return None
+    return {
+        "summary": summary.strip(),
+        "strengths": _items(note.get("strengths")),
+        "improvement_areas": _items(note.get("improvement_areas")),
+    }
+
+
+class FragmentStore:
+    """Per-repo analysis notes keyed by (owner, repo, head SHA). A SHA pins the content, so entries never go stale."""
+
+    def __init__(self, max_size: int = FRAGMENT_CACHE_SIZE, ttl: float = FRAGMENT_CACHE_TTL, db_path: str = FRAGMENT_DB):
+        self.cache = ResponseCache(max_size, ttl, db_path)
+        self.hits = 0
+        self.misses = 0
+        self.saved = 0
+
+    async def load(self, owner: str, repos: Iterable[Tuple[str, Optional[str]]]) -> Dict[str, dict]:
+        notes = {}
+        for name, sha in repos:
+            if not sha:
+                continue
+            note = await self.cache.get(fragment_key(owner, name, sha))
+            if note is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                notes[name] = note
+        return notes
+
+    async def save(self, owner: str, repos: Iterable[Tuple[str, Optional[str]]], notes: Dict[str, dict]):
+        for name, sha in repos:
+            note = clean_note(notes.get(name)) if sha else None
+            if note is None:
+                continue
+            try:
+                await self.cache.set(fragment_key(owner, name, sha), note)
+                self.saved += 1
+            except Exception as e:
+                logger.warning(f"Failed to store analysis fragment for {owner}/{name}: {e}")
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "saved": self.saved, **{
+            name: value for name, value in self.cache.stats().items() if name in ("entries", "disk")
+        }}
@@ -0,0 +1,224 @@
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import heapq
+import io
+import logging
+import os
+import re
+import tarfile
+import zlib
+from urllib.parse import quote
+import httpx
+from sampler import file_header, rank_file, skeleton
+
+logger = logging.getLogger(__name__)
+
+GITHUB_API_URL = os.environ.get("GITHUB_API_URL", "https://api.github.com")
+GITHUB_MAX_CONNECTIONS = int(os.environ.get("GITHUB_MAX_CONNECTIONS", "20"))
+GITHUB_TIMEOUT = float(os.environ.get("GITHUB_TIMEOUT", "15"))
+INGEST_MAX_REPOS = int(os.environ.get("INGEST_MAX_REPOS", "5"))
+INGEST_CODE_BYTES = int(os.environ.get("INGEST_CODE_BYTES", "40000"))
+INGEST_TARBALL_MAX_BYTES = int(os.environ.get("INGEST_TARBALL_MAX_BYTES", str(25 * 1024 * 1024)))
+INGEST_MAX_FILE_BYTES = 200_000
+
+# Same extensions the mobile client used for fetchAllRepoCode.
+CODE_EXTENSIONS = (
+    ".js", ".ts", ".py", ".java", ".go", ".rb", ".cpp", ".c", ".h", ".cs", ".php", ".rs", ".swift", ".kt", ".m",
+    ".json", ".yml", ".yaml", ".md", ".txt", ".sh", ".pl", ".html", ".css", ".scss", ".tsx", ".jsx",
+)
+
+JSON_ACCEPT = "application/vnd.github+json"
+RAW_ACCEPT = "application/vnd.github.raw"
+GITHUB_LOGIN = re.compile(r"[A-Za-z0-9](?:[A-Za-z0-9-]{0,38})")
+
+
+class GitHubNotFound(Exception):
+    pass
+
+
+def segment(value: str, safe: str = "") -> str:
+    # Names go into API paths, so "/", "?" or "#" in them must not change which endpoint is called.
+    return quote(value, safe=safe)
+
+
+def create_github_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        base_url=GITHUB_API_URL,
+        timeout=GITHUB_TIMEOUT,
+        limits=httpx.Limits(max_connections=GITHUB_MAX_CONNECTIONS, max_keepalive_connections=GITHUB_MAX_CONNECTIONS),
+        headers={"X-GitHub-Api-Version": "2022-11-28"},
+    )
+
+
+def extract_code(data: bytes, max_bytes: int = INGEST_CODE_BYTES) -> str:
+    # Tarball order is arbitrary, so keep outlines of the best ranked files that fit rather than the first files found.
+    kept: List[Tuple[float, int, str, str]] = []
+    total = 0
+    try:
+        with tarfile.open(fileobj=io.BytesIO(data), mode="r|gz") as tar:
+            for index, member in enumerate(tar):
+                if not member.isfile() or member.size > INGEST_MAX_FILE_BYTES or not member.name.endswith(CODE_EXTENSIONS):
+                    continue
+                # GitHub tarballs wrap everything in a single "<owner>-<repo>-<sha>/" directory.
+                path = member.name.split("/", 1)[-1]
+                rank = rank_file(path, member.size)
+                if total >= max_bytes and rank <= kept[0][0]:
+                    continue
+                handle = tar.extractfile(member)
+                if handle is None:
+                    continue
+                outline = skeleton(path, handle.read().decode("utf-8", errors="replace"))
+                if not outline:
+                    continue
+                heapq.heappush(kept, (rank, index, path, outline))
+                total += len(outline)
+                while total > max_bytes and len(kept) > 1:
+                    total -= len(heapq.heappop(kept)[3])
+    except (tarfile.TarError, EOFError, zlib.error) as e:
+        logger.warning(f"Tarball extraction stopped early: {e}")
+    return "".join(file_header(path, outlined=True) + outline for _, _, path, outline in sorted(kept, reverse=True))
+
+
+class GitHubIngestor:
+    def __init__(self, client: httpx.AsyncClient, etag_cache_size: int = 2048, code_cache_size: int = 256):
+        self.client = client
+        self.etag_cache_size = etag_cache_size
+        self.code_cache_size = code_cache_size
+        self._etags: "OrderedDict[Tuple[str, str, str], Tuple[str, Any]]" = OrderedDict()
+        self._code: "OrderedDict[str, str]" = OrderedDict()
+        self.requests = 0
+        self.not_modified = 0
+
+    def _headers(self, token: Optional[str], accept: str) -> Dict[str, str]:
+        headers = {"Accept": accept}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        return headers
+
+    async def get(self, path: str, token: Optional[str] = None, accept: str = JSON_ACCEPT, params: Optional[dict] = None, required: bool = False) -> Any:
+        """Returns the decoded response, or None if it could not be fetched. A 404 raises GitHubNotFound when `required`."""
+        url = str(self.client.build_request("GET", path, params=params).url)
+        # ETags differ per credential, so the token identity is part of the key.
+        key = (hashlib.sha256((token or "").encode()).hexdigest(), url, accept)
+        headers = self._headers(token, accept)
+        cached = self._etags.get(key)
+        if cached:
+            headers["If-None-Match"] = cached[0]
+        self.requests += 1
+        try:
+            resp = await self.client.get(url, headers=headers)
+        except httpx.HTTPError as e:
+            logger.warning(f"GitHub request failed for {path}: {e}")
+            return None
+        if resp.status_code == 304 and cached:
+            self.not_modified += 1
+            self._etags.move_to_end(key)
+            return cached[1]
+        if resp.status_code == 404 and required:
+            raise GitHubNotFound(path)
+        if resp.status_code != 200:
+            logger.info(f"GitHub returned {resp.status_code} for {path}")
+            return None
+        data = resp.text if accept == RAW_ACCEPT else resp.json()
+        etag = resp.headers.get("ETag")
+        if etag:
+            self._etags[key] = (etag, data)
+            self._etags.move_to_end(key)
+            while len(self._etags) > self.etag_cache_size:
+                self._etags.popitem(last=False)
+        return data
+
+    async def fetch_tree(self, owner: str, repo: str, branch: str, token: Optional[str]) -> Tuple[Optional[str], Optional[list]]:
+        data = await self.get(f"/repos/{segment(owner)}/{segment(repo)}/git/trees/{segment(branch, '/')}", token, params={"recursive": "1"})
+        if not isinstance(data, dict) or not isinstance(data.get("tree"), list):
+            return None, None
+        tree = [{"path": item.get("path"), "type": item.get("type"), "size": item.get("size", 0)} for item in data["tree"]]
+        return data.get("sha"), tree
+
+    async def fetch_code(self, owner: str, repo: str, ref: str, token: Optional[str], tree_sha: Optional[str]) -> Optional[str]:
+        if tree_sha and tree_sha in self._code:
+            self._code.move_to_end(tree_sha)
+            return self._code[tree_sha]
+        chunks = []
+        size = 0
+        self.requests += 1
+        try:
+            async with self.client.stream(
+                "GET", f"/repos/{segment(owner)}/{segment(repo)}/tarball/{segment(ref, '/')}",
+                headers=self._headers(token, JSON_ACCEPT), follow_redirects=True
+            ) as resp:
+                if resp.status_code != 200:
+                    logger.info(f"GitHub returned {resp.status_code} for {owner}/{repo} tarball")
+                    return None
+                async for chunk in resp.aiter_bytes():
+                    chunks.append(chunk)
+                    size += len(chunk)
+                    if size >= INGEST_TARBALL_MAX_BYTES:
+                        logger.info(f"Tarball for {owner}/{repo} exceeds {INGEST_TARBALL_MAX_BYTES} bytes, truncating")
+                        break
+        except httpx.HTTPError as e:
+            logger.warning(f"Tarball download failed for {owner}/{repo}: {e}")
+            return None
+        code = await asyncio.to_thread(extract_code, b"".join(chunks))
+        if tree_sha:
+            self._code[tree_sha] = code
+            while len(self._code) > self.code_cache_size:
+                self._code.popitem(last=False)
+        return code or None
+
+    async def ingest_repo(self, owner: str, repo: dict, token: Optional[str]) -> dict:
+        name = repo["name"]
+        branch = repo.get("default_branch") or "main"
+
+        async def tree_and_code():
+            tree_sha, tree = await self.fetch_tree(owner, name, branch, token)
+            code = await self.fetch_code(owner, name, branch, token, tree_sha) if tree else None
+            return tree_sha, tree, code
+
+        readme, languages, (tree_sha, tree, code) = await asyncio.gather(
+            self.get(f"/repos/{segment(owner)}/{segment(name)}/readme", token, accept=RAW_ACCEPT),
+            self.get(f"/repos/{segment(owner)}/{segment(name)}/languages", token),
+            tree_and_code(),
+        )
+        return {
+            "name": name,
+            "readme": readme,
+            "code": code,
+            "tree": tree,
+            # The root tree SHA changes exactly when the content does, so it keys stored analyses as well as a commit SHA.
+            "sha": tree_sha,
+            "stars": repo.get("stargazers_count") or 0,
+            "forks": repo.get("forks_count") or 0,
+            "topics": repo.get("topics") or [],
+            "languages": languages if isinstance(languages, dict) else ({repo["language"]: 1} if repo.get("language") else {}),
+        }
+
+    async def ingest_profile(self, username: str, token: Optional[str] = None) -> dict:
+        """Raises GitHubNotFound if there is no such user, so no analysis is run for one."""
+        if not GITHUB_LOGIN.fullmatch(username):
+            raise GitHubNotFound(f"/users/{username}")
+        user = segment(username)
+        profile, profile_readme, repos = await asyncio.gather(
+            self.get(f"/users/{user}", token, required=True),
+            self.get(f"/repos/{user}/{user}/readme", token, accept=RAW_ACCEPT),
+            self.get(f"/users/{user}/repos", token, params={"sort": "updated", "per_page": "100"}),
+        )
+        repos: List[dict] = repos if isinstance(repos, list) else []
+        latest = sorted(repos, key=lambda r: r.get("updated_at") or "", reverse=True)[:INGEST_MAX_REPOS]
+        summaries = await asyncio.gather(*[self.ingest_repo(username, repo, token) for repo in latest])
+        return {
+            "username": username,
+            "profile": profile if isinstance(profile, dict) else None,
+            "profile_readme": profile_readme,
+            "repos": list(summaries),
+        }
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "not_modified": self.not_modified,
+            "etag_entries": len(self._etags),
+            "code_entries": len(self._code),
+        }
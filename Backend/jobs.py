@@ -0,0 +1,203 @@
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+import asyncio
+import itertools
+import logging
+import os
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "32"))
+JOB_MAX_QUEUE = int(os.environ.get("JOB_MAX_QUEUE", "1000"))
+JOB_DEFAULT_DEADLINE = float(os.environ.get("JOB_DEFAULT_DEADLINE", "120"))
+JOB_ABANDON_AFTER = float(os.environ.get("JOB_ABANDON_AFTER", "30"))
+JOB_RETENTION = float(os.environ.get("JOB_RETENTION", "300"))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+EXPIRED = "expired"
+FINISHED = {DONE, FAILED, CANCELLED, EXPIRED}
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, kind: str, factory: Callable[[], Awaitable[Any]], priority: int, deadline: float):
+        now = time.monotonic()
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.priority = priority
+        self.status = QUEUED
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = now
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.deadline_at = now + deadline
+        self.last_seen = now
+        self.watchers = 0
+        self._factory = factory
+        self._task: Optional[asyncio.Task] = None
+        self._done = asyncio.Event()
+
+    def finish(self, status: str, result: Any = None, error: Optional[str] = None):
+        if self.status in FINISHED:
+            return
+        self.status = status
+        self.result = result
+        self.error = error
+        self.finished_at = time.monotonic()
+        self._done.set()
+
+    def to_dict(self) -> dict:
+        now = time.monotonic()
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "priority": self.priority,
+            "queued_seconds": round((self.started_at or self.finished_at or now) - self.created_at, 3),
+            "run_seconds": round((self.finished_at or now) - self.started_at, 3) if self.started_at else None,
+            "deadline_seconds": round(max(0.0, self.deadline_at - now), 3),
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobScheduler:
+    def __init__(self, workers: int = JOB_WORKERS, max_queue: int = JOB_MAX_QUEUE, abandon_after: float = JOB_ABANDON_AFTER, retention: float = JOB_RETENTION):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.abandon_after = abandon_after
+        self.retention = retention
+        self.jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._seq = itertools.count()
+        self._tasks: list = []
+        self._waits: Deque[float] = deque(maxlen=1000)
+        self.counts = {status: 0 for status in FINISHED}
+
+    async def start(self):
+        self._queue = asyncio.PriorityQueue()
+        self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.ensure_future(self._reaper()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for job in self.jobs.values():
+            if job._task is not None:
+                job._task.cancel()
+            job.finish(CANCELLED, error="Server shutting down")
+        self._tasks = []
+
+    def queue_depth(self) -> int:
+        return sum(1 for job in self.jobs.values() if job.status == QUEUED)
+
+    def submit(self, kind: str, factory: Callable[[], Awaitable[Any]], priority: int, deadline: Optional[float] = None) -> Job:
+        if self._queue is None:
+            raise RuntimeError("Job scheduler is not running")
+        if self.queue_depth() >= self.max_queue:
+            raise QueueFull(f"Job queue is full ({self.max_queue} queued)")
+        job = Job(kind, factory, priority, deadline if deadline is not None else JOB_DEFAULT_DEADLINE)
+        self.jobs[job.id] = job
+        self._queue.put_nowait((priority, next(self._seq), job))
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        job = self.jobs.get(job_id)
+        if job is not None:
+            job.last_seen = time.monotonic()
+        return job
+
+    async def wait(self, job: Job, timeout: float) -> Job:
+        if timeout > 0 and job.status not in FINISHED:
+            job.watchers += 1
+            try:
+                await asyncio.wait_for(job._done.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                job.watchers -= 1
+        job.last_seen = time.monotonic()
+        return job
+
+    def cancel(self, job: Job, reason: str = "Cancelled by client"):
+        if job.status in FINISHED:
+            return
+        if job._task is not None:
+            job._task.cancel()
+        self._record(job, CANCELLED, error=reason)
+
+    def _record(self, job: Job, status: str, result: Any = None, error: Optional[str] = None):
+        if job.status not in FINISHED:
+            self.counts[status] += 1
+        job.finish(status, result, error)
+
+    async def _worker(self):
+        while True:
+            _, _, job = await self._queue.get()
+            if job.status != QUEUED:
+                continue
+            now = time.monotonic()
+            self._waits.append(now - job.created_at)
+            if now >= job.deadline_at:
+                self._record(job, EXPIRED, error="Deadline passed while queued")
+                continue
+            job.status = RUNNING
+            job.started_at = now
+            job._task = asyncio.ensure_future(job._factory())
+            try:
+                result = await asyncio.wait_for(asyncio.shield(job._task), job.deadline_at - now)
+                self._record(job, DONE, result=result)
+            except asyncio.TimeoutError:
+                job._task.cancel()
+                self._record(job, EXPIRED, error="Deadline passed while running")
+            except asyncio.CancelledError:
+                if job.status in FINISHED:
+                    continue
+                job._task.cancel()
+                self._record(job, CANCELLED, error="Cancelled")
+                raise
+            except Exception as e:
+                logger.error(f"Job {job.id} ({job.kind}) failed: {str(e)}")
+                self._record(job, FAILED, error=str(e))
+
+    async def _reaper(self):
+        while True:
+            await asyncio.sleep(1)
+            now = time.monotonic()
+            for job in list(self.jobs.values()):
+                if job.status in FINISHED:
+                    if now - job.finished_at > self.retention:
+                        del self.jobs[job.id]
+                elif not job.watchers and now - job.last_seen > self.abandon_after:
+                    logger.info(f"Job {job.id} ({job.kind}) abandoned by client, cancelling")
+                    self.cancel(job, reason="Abandoned: no poll within the lease")
+
+    def stats(self) -> dict:
+        waits = sorted(self._waits)
+        by_priority: Dict[int, int] = {}
+        running = 0
+        for job in self.jobs.values():
+            if job.status == QUEUED:
+                by_priority[job.priority] = by_priority.get(job.priority, 0) + 1
+            elif job.status == RUNNING:
+                running += 1
+        return {
+            "workers": self.workers,
+            "queue_depth": sum(by_priority.values()),
+            "queue_depth_by_priority": by_priority,
+            "running": running,
+            "wait_seconds_p50": round(waits[len(waits) // 2], 3) if waits else 0.0,
+            "wait_seconds_p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3) if waits else 0.0,
+            "finished": dict(self.counts),
+        }
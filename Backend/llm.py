@@ -0,0 +1,145 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, Optional
+from router import LLMRouter
+from metrics import prompt_chars, response_chars, stage_seconds
+import asyncio
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "200"))
+LLM_ENDPOINT_CONCURRENCY = {
+    "dev-profile": int(os.environ.get("LLM_DEV_PROFILE_CONCURRENCY", "50")),
+    "repo": int(os.environ.get("LLM_REPO_CONCURRENCY", "100")),
+    "goal": int(os.environ.get("LLM_GOAL_CONCURRENCY", "100")),
+}
+LLM_STARTUP = os.environ.get("LLM_STARTUP", "background")  # background, lazy or eager
+
+
+class LazyClient:
+    """Imports g4f and builds its AsyncClient on first use; the g4f import is the largest part of process start-up."""
+
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._client is not None
+
+    def load(self):
+        with self._lock:
+            if self._client is None:
+                from g4f.client import AsyncClient
+                self._client = AsyncClient()
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self.load(), name)
+
+
+class LLMClient:
+    def __init__(self, client=None, max_concurrency: int = LLM_MAX_CONCURRENCY, endpoint_limits: Optional[Dict[str, int]] = None, router: Optional[LLMRouter] = None):
+        self.client = client if client is not None else LazyClient()
+        self.router = router if router is not None else LLMRouter.from_env(self.client)
+        self.max_concurrency = max_concurrency
+        self.endpoint_limits = dict(endpoint_limits if endpoint_limits is not None else LLM_ENDPOINT_CONCURRENCY)
+        self._global = asyncio.Semaphore(max_concurrency)
+        self._endpoints = {name: asyncio.Semaphore(limit) for name, limit in self.endpoint_limits.items()}
+        self.in_flight: Dict[str, int] = {name: 0 for name in self.endpoint_limits}
+        self.waiting: Dict[str, int] = {name: 0 for name in self.endpoint_limits}
+        self.warmup_error: Optional[str] = None
+
+    @property
+    def ready(self) -> bool:
+        return not isinstance(self.client, LazyClient) or self.client.loaded
+
+    async def warm_up(self):
+        # Loaded in a thread so the event loop keeps serving while g4f imports.
+        if self.ready:
+            return
+        start = time.perf_counter()
+        try:
+            await asyncio.to_thread(self.client.load)
+        except Exception as e:
+            self.warmup_error = f"{type(e).__name__}: {e}"
+            raise
+        self.warmup_error = None
+        logger.info(f"LLM client loaded in {time.perf_counter() - start:.2f}s")
+
+    @asynccontextmanager
+    async def slot(self, endpoint: str):
+        endpoint_sem = self._endpoints.get(endpoint)
+        self.waiting[endpoint] = self.waiting.get(endpoint, 0) + 1
+        start = time.perf_counter()
+        try:
+            if endpoint_sem is not None:
+                await endpoint_sem.acquire()
+            try:
+                await self._global.acquire()
+            except BaseException:
+                if endpoint_sem is not None:
+                    endpoint_sem.release()
+                raise
+        finally:
+            self.waiting[endpoint] -= 1
+        stage_seconds.observe(time.perf_counter() - start, endpoint=endpoint, stage="llm_queue")
+        self.in_flight[endpoint] = self.in_flight.get(endpoint, 0) + 1
+        try:
+            yield
+        finally:
+            self.in_flight[endpoint] -= 1
+            self._global.release()
+            if endpoint_sem is not None:
+                endpoint_sem.release()
+
+    async def extra_slot(self, endpoint: str) -> Optional[Callable[[], None]]:
+        """Takes a slot only if one is free right now and returns its release, for hedged attempts."""
+        endpoint_sem = self._endpoints.get(endpoint)
+        if self._global.locked() or endpoint_sem is not None and endpoint_sem.locked():
+            return None
+        # Neither semaphore is locked, so these acquires return without yielding to another task.
+        if endpoint_sem is not None:
+            await endpoint_sem.acquire()
+        await self._global.acquire()
+        self.in_flight[endpoint] = self.in_flight.get(endpoint, 0) + 1
+
+        def release():
+            self.in_flight[endpoint] -= 1
+            self._global.release()
+            if endpoint_sem is not None:
+                endpoint_sem.release()
+        return release
+
+    async def complete(self, prompt: str, endpoint: str, max_tokens: int, temperature: float) -> Optional[str]:
+        prompt_chars.observe(len(prompt), endpoint=endpoint)
+        await self.warm_up()
+        async with self.slot(endpoint):
+            with stage_seconds.time(endpoint=endpoint, stage="llm_call"):
+                content = await self.router.complete(prompt, endpoint, max_tokens, temperature, extra_slot=lambda: self.extra_slot(endpoint))
+        response_chars.observe(len(content or ""), endpoint=endpoint)
+        return content
+
+    async def stream(self, prompt: str, endpoint: str, max_tokens: int, temperature: float) -> AsyncIterator[str]:
+        prompt_chars.observe(len(prompt), endpoint=endpoint)
+        received = 0
+        await self.warm_up()
+        async with self.slot(endpoint):
+            with stage_seconds.time(endpoint=endpoint, stage="llm_call"):
+                async for token in self.router.stream(prompt, endpoint, max_tokens, temperature):
+                    received += len(token)
+                    yield token
+        response_chars.observe(received, endpoint=endpoint)
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "endpoint_limits": self.endpoint_limits,
+            "in_flight": dict(self.in_flight),
+            "waiting": dict(self.waiting),
+            "ready": self.ready,
+            "router": self.router.stats(),
+        }
@@ -1,14 +1,37 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse, JSONResponse
-from pydantic import BaseModel
-from g4f import Client
-from typing import List, Optional
+from fastapi.responses import RedirectResponse, JSONResponse, ORJSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, field_validator
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Sequence, Tuple, Type, Union
 from dotenv import load_dotenv
 import os
 import logging
-from concurrent.futures import ThreadPoolExecutor
 import asyncio
+import random
+from admission import Admission, AdmissionMiddleware, shed_decision
+from llm import LLM_STARTUP, LLMClient
+from cache import ResponseCache, request_key
+from fragments import FragmentStore, clean_note
+from similarity import SimilarityIndex, boilerplate, goal_key
+from streaming import IncrementalJSONParser, sse_event
+from parsing import parse_stats, structured_output
+from scoring import commit_patterns, repo_insights, score_repos, top_languages
+from conversations import ConversationStore, build_summary_prompt, conversation_key, format_ai_turn
+from ingest import GitHubIngestor, GitHubNotFound, create_github_client
+from jobs import JobScheduler, QueueFull
+from metrics import MetricsMiddleware, record_analysis, registry, stage_seconds
+from wire import ORJSONRoute, WireMiddleware, expand_tree
+from prompts import (
+    PromptBudget,
+    PROMPT_CHAT_TOKENS,
+    PROMPT_CODE_TOKENS,
+    PROMPT_COMMITS_TOKENS,
+    PROMPT_PROFILE_README_TOKENS,
+    PROMPT_PROFILE_TOKENS,
+    PROMPT_PROGRESS_TOKENS,
+    PROMPT_README_TOKENS,
+)
 import httpx
 import json
 
@@ -20,8 +43,40 @@ logger = logging.getLogger(__name__)
 GITHUB_CLIENT_ID = os.environ.get("GITHUB_CLIENT_ID", "")
 GITHUB_CLIENT_SECRET = os.environ.get("GITHUB_CLIENT_SECRET", "")
 GITHUB_OAUTH_REDIRECT_URI = os.environ.get("GITHUB_OAUTH_REDIRECT_URI", "http://localhost:8000/auth/github/callback")
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", "50"))
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", "8"))
+BATCH_ITEM_TIMEOUT = float(os.environ.get("BATCH_ITEM_TIMEOUT", "60"))
+PAYLOAD_LOG_SAMPLE_RATE = float(os.environ.get("PAYLOAD_LOG_SAMPLE_RATE", "0"))
+JOB_MAX_WAIT = float(os.environ.get("JOB_MAX_WAIT", "30"))
+DISCONNECT_POLL_INTERVAL = float(os.environ.get("DISCONNECT_POLL_INTERVAL", "1"))
+# Lower runs first: interactive goal chats ahead of single repos ahead of bulk profile work.
+JOB_PRIORITIES = {"analyze-goal": 0, "analyze-repo": 1, "analyze-repos": 2, "analyze-dev-profile": 2}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warmup = None
+    if LLM_STARTUP == "eager":
+        await llm.warm_up()
+    elif LLM_STARTUP == "background":
+        warmup = asyncio.ensure_future(warm_up_llm())
+    async with create_github_client() as client:
+        app.state.github = GitHubIngestor(client)
+        await jobs.start()
+        try:
+            yield
+        finally:
+            await jobs.stop()
+            if warmup is not None:
+                warmup.cancel()
+
+async def warm_up_llm():
+    try:
+        await llm.warm_up()
+    except Exception as e:
+        logger.error(f"LLM client warm-up failed, retrying on first use: {e}")
 
-app = FastAPI(title="DevTracker API", description="Learning Progress Tracker API")
+app = FastAPI(title="DevTracker API", description="Learning Progress Tracker API", lifespan=lifespan, default_response_class=ORJSONResponse)
+app.router.route_class = ORJSONRoute
 
 app.add_middleware(
     CORSMiddleware,
@@ -30,19 +85,35 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+admission = Admission()
+
+app.add_middleware(WireMiddleware)
+app.add_middleware(AdmissionMiddleware, admission=admission)
+app.add_middleware(MetricsMiddleware)
 
-g4f_client = Client()
-executor = ThreadPoolExecutor(max_workers=5)
+llm = LLMClient()
+response_cache = ResponseCache()
+fragments = FragmentStore()
+similar_goals = SimilarityIndex()
+conversations = ConversationStore()
+jobs = JobScheduler()
 
 class RepoSummary(BaseModel):
     name: str
     readme: Optional[str] = None
     code: Optional[str] = None
-    tree: Optional[list] = None  
+    tree: Optional[list] = None  # Entry dicts, or the compact {"path": [...], "type": [...], "size": [...]} form
     stars: int = 0
     forks: int = 0
     topics: List[str] = []
     languages: dict = {}
+    commit_messages: List[str] = []
+    sha: Optional[str] = None  # Head SHA; an unchanged repo is described by its stored analysis instead of re-analyzed
+
+    @field_validator("tree", mode="before")
+    @classmethod
+    def expand_compact_tree(cls, tree):
+        return expand_tree(tree)
 
 class DevAnalysisRequest(BaseModel):
     username: str
@@ -62,8 +133,10 @@ class DevAnalysisResponse(BaseModel):
     motivation_message: str
     project_complexity: Optional[dict] = None
     coding_patterns: Optional[dict] = None
+    repo_notes: Optional[dict] = None
     ai_success: bool = True
     source: str = "ai"
+    trimmed_sections: List[str] = []
 
 class RepoAnalysisRequest(BaseModel):
     username: str
@@ -76,7 +149,13 @@ class RepoAnalysisRequest(BaseModel):
     topics: List[str] = []
     size: int = 0
     code: Optional[str] = None
-    tree: Optional[list] = None  
+    tree: Optional[list] = None  # Entry dicts, or the compact {"path": [...], "type": [...], "size": [...]} form
+    sha: Optional[str] = None  # Head SHA; the analysis is kept as a fragment for later profile analyses
+
+    @field_validator("tree", mode="before")
+    @classmethod
+    def expand_compact_tree(cls, tree):
+        return expand_tree(tree)
 
 class RepoAnalysisResponse(BaseModel):
     summary: str
@@ -88,6 +167,29 @@ class RepoAnalysisResponse(BaseModel):
     recommendations: List[str]
     ai_success: bool = True
     source: str = "ai"
+    trimmed_sections: List[str] = []
+
+class RepoBatchRequest(BaseModel):
+    repos: List[RepoAnalysisRequest]
+
+class RepoBatchItem(BaseModel):
+    index: int
+    repo_name: str
+    analysis: RepoAnalysisResponse
+
+class RepoBatchResponse(BaseModel):
+    results: List[RepoBatchItem]
+
+class JobResponse(BaseModel):
+    job_id: str
+    kind: str
+    status: str
+    priority: int
+    queued_seconds: float
+    run_seconds: Optional[float] = None
+    deadline_seconds: float
+    result: Optional[dict] = None
+    error: Optional[str] = None
 
 class LearningAnalysisRequest(BaseModel):
     goal_title: str
@@ -95,12 +197,16 @@ class LearningAnalysisRequest(BaseModel):
     current_progress: str
     description: Optional[str] = None
     chat_history: Optional[list] = None  # List of dicts: {"role": "user"|"ai", "message": str}
+    goal_id: Optional[str] = None  # When set, history is kept server-side and current_progress is only the new message
 
 class LearningAnalysisResponse(BaseModel):
     suggestions: List[str]
     next_steps: List[str]
     estimated_time: str
     resources: List[str]
+    ai_success: bool = True
+    source: str = "ai"
+    trimmed_sections: List[str] = []
 
 @app.get("/auth/github/login")
 async def github_login(request: Request):
@@ -118,7 +224,7 @@ async def github_login(request: Request):
 
 @app.get("/auth/github/callback")
 async def github_callback(request: Request, code: str = None, state: str = None):
-    logger.info(f"/auth/github/callback called with code: {code}")
+    logger.info("/auth/github/callback called")
     if not code:
         logger.error("Missing code in callback.")
         raise HTTPException(status_code=400, detail="Missing code in callback.")
@@ -138,7 +244,7 @@ async def github_callback(request: Request, code: str = None, state: str = None)
     async with httpx.AsyncClient() as client:
         token_resp = await client.post(token_url, headers=headers, data=data)
         token_json = token_resp.json()
-        logger.info(f"GitHub token response: {token_json}")
+        logger.debug(f"GitHub token response fields: {sorted(token_json)}")
         access_token = token_json.get("access_token")
         if not access_token:
             logger.error("Failed to obtain access token from GitHub.")
@@ -148,28 +254,112 @@ async def github_callback(request: Request, code: str = None, state: str = None)
         logger.error("Missing 'state' (Expo app URI) in callback.")
         raise HTTPException(status_code=400, detail="Missing 'state' (Expo app URI) in callback.")
     redirect_url = f"{next_uri}#access_token={access_token}"
-    logger.info(f"Redirecting to Expo app: {redirect_url}")
+    logger.info(f"Redirecting to Expo app: {next_uri}")
     return RedirectResponse(redirect_url)
 
-def analyze_developer_profile(data: DevAnalysisRequest) -> dict:
-    try:
-        profile_str = json.dumps(data.profile, indent=2) if data.profile else "No profile info"
-        profile_readme = data.profile_readme[:500] if data.profile_readme else "No profile README"
-        repo_summaries = []
-        for repo in data.repos[:5]:
-            section = f"\n===== BEGIN REPO: {repo.name} ====="
-            section += f"\nStars: {repo.stars} | Forks: {repo.forks} | Topics: {', '.join(repo.topics)}"
-            section += f"\nLanguages: {json.dumps(repo.languages)}"
-            if repo.tree:
-                section += f"\n\n[FILE TREE]\n{json.dumps(repo.tree, indent=2)}"
-            if repo.readme:
-                section += f"\n\n[README]\n{repo.readme[:300]}"
-            if repo.code:
-                section += f"\n\n[CODE SAMPLE]\n{repo.code[:1000]}"
+def log_payload(label: str, payload):
+    # Full payloads are large; log them at debug level, or for a sample of requests at info level.
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"{label}: {payload}")
+    elif PAYLOAD_LOG_SAMPLE_RATE and random.random() < PAYLOAD_LOG_SAMPLE_RATE:
+        logger.info(f"{label} (sampled): {payload}")
+
+def repo_features(data: Union[RepoAnalysisRequest, RepoSummary]) -> dict:
+    return {
+        "stars": data.stars,
+        "forks": data.forks,
+        "readme": data.readme_content if isinstance(data, RepoAnalysisRequest) else data.readme,
+        "tree": data.tree,
+        "commit_messages": data.commit_messages,
+    }
+
+async def score_repo_requests(repos: Sequence[Union[RepoAnalysisRequest, RepoSummary]]) -> List[dict]:
+    # Tree scans are CPU-bound; like prompt building they run off the event loop.
+    return await asyncio.to_thread(score_repos, [repo_features(item) for item in repos])
+
+def repo_local_fields(score: dict) -> dict:
+    return {"popularity_score": score["popularity_score"], "documentation_score": score["documentation_score"]}
+
+def dev_local_fields(data: DevAnalysisRequest, notes: Optional[dict] = None) -> dict:
+    local = {}
+    notes = notes or {}
+    languages = top_languages([repo.languages for repo in data.repos])
+    if languages:
+        local["top_languages"] = languages
+    patterns = commit_patterns([message for repo in data.repos for message in repo.commit_messages])
+    if patterns:
+        local["coding_patterns"] = patterns
+    # Notes are only asked of the model for repos with a SHA and no stored analysis yet.
+    if all(repo.name in notes for repo in data.repos[:5] if repo.sha):
+        local["repo_notes"] = notes or None
+    return local
+
+async def load_repo_notes(data: DevAnalysisRequest) -> dict:
+    return await fragments.load(data.username, [(repo.name, repo.sha) for repo in data.repos[:5]])
+
+async def merge_repo_notes(data: DevAnalysisRequest, notes: dict, result: dict):
+    # Stored notes cover unchanged repos; the reply only describes the repos that were sent in full.
+    fresh = result.get("repo_notes") if isinstance(result.get("repo_notes"), dict) else {}
+    merged = {}
+    for repo in data.repos[:5]:
+        note = notes.get(repo.name) or clean_note(fresh.get(repo.name))
+        if note:
+            merged[repo.name] = note
+    result["repo_notes"] = merged or None
+    await fragments.save(data.username, [(repo.name, repo.sha) for repo in data.repos[:5] if repo.name not in notes], merged)
+
+async def store_repo_fragment(data: RepoAnalysisRequest, result: dict):
+    if data.sha:
+        await fragments.save(data.username, [(data.repo_name, data.sha)], {data.repo_name: result})
+
+def build_dev_profile_prompt(data: DevAnalysisRequest, local: Optional[dict] = None, notes: Optional[dict] = None) -> Tuple[str, List[str]]:
+    local = local or {}
+    notes = notes or {}
+    budget = PromptBudget()
+    profile_str = budget.fit("profile", json.dumps(data.profile, separators=(",", ":")), PROMPT_PROFILE_TOKENS) if data.profile else "No profile info"
+    profile_readme = budget.fit("profile_readme", data.profile_readme, PROMPT_PROFILE_README_TOKENS) or "No profile README"
+    repo_summaries = []
+    for repo in data.repos[:5]:
+        section = f"\n===== BEGIN REPO: {repo.name} ====="
+        section += f"\nStars: {repo.stars} | Forks: {repo.forks} | Topics: {', '.join(repo.topics)}"
+        section += f"\nLanguages: {json.dumps(repo.languages)}"
+        note = notes.get(repo.name)
+        if note:
+            section += f"\n\n[EARLIER ANALYSIS, UNCHANGED SINCE]\nSummary: {note['summary']}"
+            if note["strengths"]:
+                section += f"\nStrengths: {'; '.join(note['strengths'])}"
+            if note["improvement_areas"]:
+                section += f"\nImprovement areas: {'; '.join(note['improvement_areas'])}"
             section += f"\n===== END REPO: {repo.name} ====="
             repo_summaries.append(section)
-        repos_str = "\n\n".join(repo_summaries)
-        prompt = f"""
+            continue
+        if repo.tree:
+            section += f"\n\n[FILE TREE SUMMARY]\n{budget.tree(f'{repo.name}/tree', repo.tree)}"
+        if repo.readme:
+            section += f"\n\n[README]\n{budget.fit(f'{repo.name}/readme', repo.readme, PROMPT_README_TOKENS)}"
+        if repo.code:
+            section += f"\n\n[CODE SAMPLE]\n{budget.code(f'{repo.name}/code', repo.code, PROMPT_CODE_TOKENS, repo.tree, repo.languages)}"
+        section += f"\n===== END REPO: {repo.name} ====="
+        repo_summaries.append(section)
+    repos_str = "\n\n".join(repo_summaries)
+    computed = {field: value for field, value in local.items() if field != "repo_notes"}
+    computed_str = f"\nAlready computed (do not include these fields in your reply): {json.dumps(computed)}\n" if computed else ""
+    fresh = [repo.name for repo in data.repos[:5] if repo.sha and repo.name not in notes]
+    repo_notes_block = '' if "repo_notes" in local or not fresh else """,
+    "repo_notes": {
+        "<repo name>": {"summary": "1-2 sentences on this repository", "strengths": ["strength1"], "improvement_areas": ["area1"]}
+    }"""
+    repo_notes_line = f"\nInclude one repo_notes entry for each of these repositories: {', '.join(fresh)}." if repo_notes_block else ""
+    top_languages_line = '' if "top_languages" in local else '\n    "top_languages": ["lang1", "lang2", "lang3"],'
+    coding_patterns_block = '' if "coding_patterns" in local else """,
+    "coding_patterns": {
+        "consistency": 0-100,
+        "velocity": 0-100,
+        "quality": 0-100,
+        "patterns": ["pattern1", "pattern2"],
+        "confidence": 0-1
+    }"""
+    prompt = f"""
 You are an advanced AI coding mentor. Analyze this developer's full GitHub profile and provide a comprehensive, actionable, and motivating assessment.
 
 Developer: {data.username}
@@ -178,12 +368,11 @@ Profile README: {profile_readme}
 ----
 Sample of 5 Repositories (each section is clearly separated by '===== BEGIN REPO: <name> =====' and '===== END REPO: <name> ====='):
 {repos_str}
-
+{computed_str}
 Reply ONLY in this JSON format:
 {{
     "summary": "2-3 sentence overview of their current development level",
-    "skill_level": "beginner/intermediate/advanced",
-    "top_languages": ["lang1", "lang2", "lang3"],
+    "skill_level": "beginner/intermediate/advanced",{top_languages_line}
     "strengths": ["strength1", "strength2", "strength3"],
     "improvement_areas": ["area1", "area2", "area3"],
     "recommended_goals": [
@@ -199,41 +388,14 @@ Reply ONLY in this JSON format:
         "architecture": 0-100,
         "scalability": 0-100,
         "reasoning": "Short reasoning about complexity"
-    }},
-    "coding_patterns": {{
-        "consistency": 0-100,
-        "velocity": 0-100,
-        "quality": 0-100,
-        "patterns": ["pattern1", "pattern2"],
-        "confidence": 0-1
-    }}
-}}
+    }}{coding_patterns_block}{repo_notes_block}
+}}{repo_notes_line}
 Make your analysis personal, specific, and focused on real growth opportunities.
 """
-        response = g4f_client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=1200,
-            temperature=0.6
-        )
-        if response and response.choices:
-            content = response.choices[0].message.content
-            try:
-                if '{' in content and '}' in content:
-                    json_start = content.find('{')
-                    json_end = content.rfind('}') + 1
-                    result = json.loads(content[json_start:json_end])
-                    result["ai_success"] = True
-                    result["source"] = "ai"
-                    return result
-            except Exception as parse_error:
-                logger.warning(f"JSON parsing failed: {parse_error}")
-        logger.warning("AI response missing or invalid, using fallback.")
-    except Exception as e:
-        logger.error(f"Developer profile analysis error: {str(e)}")
-        logger.warning("AI analysis failed, using fallback.")
+    return prompt, budget.trimmed
 
-    return {
+def dev_profile_fallback(data: Optional[DevAnalysisRequest] = None, local: Optional[dict] = None, scores: Optional[List[dict]] = None) -> dict:
+    fallback = {
         "summary": "No AI analysis available. This is a fallback response.",
         "skill_level": "unknown",
         "top_languages": [],
@@ -260,44 +422,46 @@ Make your analysis personal, specific, and focused on real growth opportunities.
         "ai_success": False,
         "source": "fallback"
     }
-
-def analyze_repo_profile(data: RepoAnalysisRequest) -> dict:
-    try:
-        code_snippet = (data.code[:1000] + '\n...\n[truncated]') if data.code and len(data.code) > 1200 else (data.code or None)
-        prompt = f"You are a senior open-source reviewer. Analyze this GitHub repository and provide clear, actionable, and constructive feedback.\n\n"
-        prompt += f"Repository: {data.repo_name}\nOwner: {data.username}\nStars: {data.stars}\nForks: {data.forks}\nTopics: {', '.join(data.topics)}\nSize: {data.size} KB\nLanguages: {', '.join([f'{lang} ({pct})' for lang, pct in data.repo_languages.items()])}\n"
-        if data.tree:
-            prompt += f"\n[FILE TREE]\n{json.dumps(data.tree, indent=2)}"
-        if data.readme_content:
-            prompt += f"\n[README]\n{data.readme_content[:300]}"
-        if code_snippet:
-            prompt += f"\n[CODE SAMPLE]\n{code_snippet}"
-        prompt += f"\nRecent Commits: {'; '.join(data.commit_messages[-10:])}\n"
-        prompt += "\nReply ONLY in this JSON format:\n{\n    \"summary\": \"Short summary of repo quality and focus\",\n    \"strengths\": [\"strength1\", \"strength2\"],\n    \"improvement_areas\": [\"area1\", \"area2\"],\n    \"code_quality_score\": 0-100,\n    \"popularity_score\": 0-100,\n    \"documentation_score\": 0-100,\n    \"recommendations\": [\"rec1\", \"rec2\"]\n}\nMake your review specific, constructive, and focused on real improvement."
-        response = g4f_client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=700,
-            temperature=0.7
+    if data is None:
+        return fallback
+    local = local if local is not None else dev_local_fields(data)
+    fallback.update(local)
+    scores = scores if scores is not None else score_repos([repo_features(repo) for repo in data.repos[:5]])
+    if scores:
+        languages = ", ".join(local.get("top_languages", [])) or "no detected languages"
+        fallback["summary"] = (
+            f"Local analysis (no AI) of {len(scores)} repositories using {languages}. "
+            f"Average documentation score {round(sum(s['documentation_score'] for s in scores) / len(scores))}/100, "
+            f"average code quality signals {round(sum(s['code_quality_score'] for s in scores) / len(scores))}/100."
         )
-        if response and response.choices:
-            content = response.choices[0].message.content
-            try:
-                if '{' in content and '}' in content:
-                    json_start = content.find('{')
-                    json_end = content.rfind('}') + 1
-                    result = json.loads(content[json_start:json_end])
-                    result["ai_success"] = True
-                    result["source"] = "ai"
-                    return result
-            except Exception as parse_error:
-                logger.warning(f"Repo JSON parsing failed: {parse_error}")
-        logger.warning("Repo AI response missing or invalid, using fallback.")
-    except Exception as e:
-        logger.error(f"Repo analysis error: {str(e)}")
-        logger.warning("Repo AI analysis failed, using fallback.")
+        insights = [repo_insights(score, bool(repo.readme)) for score, repo in zip(scores, data.repos[:5])]
+        for field in ("strengths", "improvement_areas"):
+            fallback[field] = list(dict.fromkeys(item for insight in insights for item in insight[field]))[:5]
+    return fallback
 
-    return {
+def build_repo_prompt(data: RepoAnalysisRequest, local: Optional[dict] = None) -> Tuple[str, List[str]]:
+    local = local or {}
+    budget = PromptBudget()
+    code_snippet = budget.code("code", data.code, PROMPT_CODE_TOKENS, data.tree, data.repo_languages)
+    prompt = f"You are a senior open-source reviewer. Analyze this GitHub repository and provide clear, actionable, and constructive feedback.\n\n"
+    prompt += f"Repository: {data.repo_name}\nOwner: {data.username}\nStars: {data.stars}\nForks: {data.forks}\nTopics: {', '.join(data.topics)}\nSize: {data.size} KB\nLanguages: {', '.join([f'{lang} ({pct})' for lang, pct in data.repo_languages.items()])}\n"
+    if data.tree:
+        prompt += f"\n[FILE TREE SUMMARY]\n{budget.tree('tree', data.tree)}"
+    if data.readme_content:
+        prompt += f"\n[README]\n{budget.fit('readme', data.readme_content, PROMPT_README_TOKENS)}"
+    if code_snippet:
+        prompt += f"\n[CODE SAMPLE]\n{code_snippet}"
+    prompt += f"\nRecent Commits: {budget.join('commits', data.commit_messages[-10:], '; ', PROMPT_COMMITS_TOKENS)}\n"
+    if local:
+        prompt += f"\nAlready computed (do not include these fields in your reply): {json.dumps(local)}\n"
+    score_lines = "".join(
+        f"    \"{field}\": 0-100,\n" for field in ("code_quality_score", "popularity_score", "documentation_score") if field not in local
+    )
+    prompt += "\nReply ONLY in this JSON format:\n{\n    \"summary\": \"Short summary of repo quality and focus\",\n    \"strengths\": [\"strength1\", \"strength2\"],\n    \"improvement_areas\": [\"area1\", \"area2\"],\n" + score_lines + "    \"recommendations\": [\"rec1\", \"rec2\"]\n}\nMake your review specific, constructive, and focused on real improvement."
+    return prompt, budget.trimmed
+
+def repo_fallback(data: Optional[RepoAnalysisRequest] = None, score: Optional[dict] = None) -> dict:
+    fallback = {
         "summary": "No AI analysis available. This is a fallback response.",
         "strengths": [],
         "improvement_areas": [],
@@ -308,103 +472,377 @@ def analyze_repo_profile(data: RepoAnalysisRequest) -> dict:
         "ai_success": False,
         "source": "fallback"
     }
+    if data is None:
+        return fallback
+    score = score if score is not None else score_repos([repo_features(data)])[0]
+    insights = repo_insights(score, bool(data.readme_content))
+    fallback.update({
+        "summary": (
+            f"Local analysis (no AI) of {data.repo_name}: popularity {score['popularity_score']}/100, "
+            f"documentation {score['documentation_score']}/100, code quality signals {score['code_quality_score']}/100."
+        ),
+        "strengths": insights["strengths"],
+        "improvement_areas": insights["improvement_areas"],
+        "code_quality_score": score["code_quality_score"],
+        "popularity_score": score["popularity_score"],
+        "documentation_score": score["documentation_score"],
+        "recommendations": insights["recommendations"] or ["Keep documentation and tests in step with new features"],
+    })
+    return fallback
+
+def build_goal_prompt(goal_title: str, category: str, progress: str, description: Optional[str] = None, chat_history: Optional[list] = None, summary: Optional[str] = None) -> Tuple[str, List[str]]:
+    budget = PromptBudget()
+    chat_str = f"Summary of earlier turns: {summary}\n" if summary else ""
+    if chat_history:
+        turns = []
+        for i, turn in enumerate(chat_history):
+            role = turn.get("role", "user")
+            label = "User" if role == "user" else "AI"
+            turns.append(f"Turn {i+1} - {label}: {turn.get('message', '')}\n")
+        chat_str += budget.join("chat_history", turns, "", PROMPT_CHAT_TOKENS)
+    elif not summary:
+        chat_str = "No previous chat.\n"
+
+    progress_str = budget.join("current_progress", progress.splitlines(), "\n", PROMPT_PROGRESS_TOKENS) if progress and progress.strip() else "User is starting now."
+
+    prompt = (
+        "You are a learning mentor for developers. You will help the user achieve their coding goal through an iterative, chat-based process.\n\n"
+        "Below is the chat history between the user and the AI. Each turn is clearly labeled as 'User' or 'AI'.\n---\n"
+        f"{chat_str}"
+        "---\n"
+        "The user has just entered NEW PROGRESS (since the last message):\n"
+        f"{progress_str}\n"
+        "This is their latest GitHub data (profile, repos, etc) as context (if provided by the frontend).\n\n"
+        f"Goal: {goal_title}\n"
+        f"Category: {category}\n"
+        f"Description: {description if description else ''}\n\n"
+        "Your task:\n"
+        "- Focus your suggestions on the user's most recent progress and their current context.\n"
+        "- Use the chat history to avoid repeating advice and to build on previous suggestions.\n"
+        "- Reply ONLY in this JSON format:\n"
+        '{\n'
+        '    "suggestions": ["suggestion1", "suggestion2", "suggestion3"],\n'
+        '    "next_steps": ["step1", "step2", "step3"],\n'
+        '    "estimated_time": "X hours/days/weeks",\n'
+        '    "resources": ["resource1", "resource2", "resource3"]\n'
+        '}\n'
+        "Keep suggestions practical, actionable, and tailored to the user's latest progress."
+    )
+    return prompt, budget.trimmed
+
+def goal_fallback(goal_title: Optional[str] = None, category: Optional[str] = None) -> dict:
+    if not goal_title:
+        return {
+            "suggestions": ["Keep practicing consistently", "Break complex topics into smaller parts"],
+            "next_steps": ["Review fundamentals", "Build a small project"],
+            "estimated_time": "Varies based on complexity",
+            "resources": ["Documentation", "Online tutorials"],
+            "ai_success": False,
+            "source": "fallback"
+        }
+    return {
+        "suggestions": [
+            f"Break down {goal_title} into smaller daily tasks",
+            f"Practice {category} concepts for 30 minutes daily",
+            "Join online communities for peer support"
+        ],
+        "next_steps": [
+            "Review current progress and identify gaps",
+            "Set specific weekly milestones",
+            "Find practice projects"
+        ],
+        "estimated_time": "2-4 weeks with consistent practice",
+        "resources": [
+            "Official documentation",
+            "YouTube tutorials",
+            "Practice coding platforms"
+        ],
+        "ai_success": False,
+        "source": "fallback"
+    }
 
-def analyze_learning_progress(goal_title: str, category: str, progress: str, description: Optional[str] = None, chat_history: Optional[list] = None) -> dict:
+async def analyze_developer_profile(data: DevAnalysisRequest) -> dict:
+    local = {}
     try:
-        chat_str = ""
-        if chat_history:
-            for i, turn in enumerate(chat_history):
-                role = turn.get("role", "user")
-                label = "User" if role == "user" else "AI"
-                chat_str += f"Turn {i+1} - {label}: {turn.get('message', '')}\n"
-        else:
-            chat_str = "No previous chat.\n"
-
-        progress_str = progress if progress and progress.strip() else "User is starting now."
-
-        prompt = (
-            "You are a learning mentor for developers. You will help the user achieve their coding goal through an iterative, chat-based process.\n\n"
-            "Below is the chat history between the user and the AI. Each turn is clearly labeled as 'User' or 'AI'.\n---\n"
-            f"{chat_str}"
-            "---\n"
-            "The user has just entered NEW PROGRESS (since the last message):\n"
-            f"{progress_str}\n"
-            "This is their latest GitHub data (profile, repos, etc) as context (if provided by the frontend).\n\n"
-            f"Goal: {goal_title}\n"
-            f"Category: {category}\n"
-            f"Description: {description if description else ''}\n\n"
-            "Your task:\n"
-            "- Focus your suggestions on the user's most recent progress and their current context.\n"
-            "- Use the chat history to avoid repeating advice and to build on previous suggestions.\n"
-            "- Reply ONLY in this JSON format:\n"
-            '{\n'
-            '    "suggestions": ["suggestion1", "suggestion2", "suggestion3"],\n'
-            '    "next_steps": ["step1", "step2", "step3"],\n'
-            '    "estimated_time": "X hours/days/weeks",\n'
-            '    "resources": ["resource1", "resource2", "resource3"]\n'
-            '}\n'
-            "Keep suggestions practical, actionable, and tailored to the user's latest progress."
-        )
-        response = g4f_client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=500,
-            temperature=0.7
-        )
-        if response and response.choices:
-            content = response.choices[0].message.content
+        notes = await load_repo_notes(data)
+        local = dev_local_fields(data, notes)
+        with stage_seconds.time(endpoint="dev-profile", stage="prompt_build"):
+            prompt, trimmed = await asyncio.to_thread(build_dev_profile_prompt, data, local, notes)
+        ask = lambda p: llm.complete(p, endpoint="dev-profile", max_tokens=1200, temperature=0.6)
+        content = await ask(prompt)
+        if content:
+            try:
+                result = await structured_output(
+                    "dev-profile", prompt, content, DevAnalysisResponse, lambda: dev_profile_fallback(data, local), ask, local
+                )
+                if result is not None:
+                    result["trimmed_sections"] = trimmed
+                    await merge_repo_notes(data, notes, result)
+                    return result
+            except Exception as parse_error:
+                logger.warning(f"JSON parsing failed: {parse_error}")
+        logger.warning("AI response missing or invalid, using fallback.")
+    except Exception as e:
+        logger.error(f"Developer profile analysis error: {str(e)}")
+        logger.warning("AI analysis failed, using fallback.")
+
+    parse_stats.record("dev-profile", "fallback")
+    return dev_profile_fallback(data, local, await score_repo_requests(data.repos[:5]))
+
+async def analyze_repo_profile(data: RepoAnalysisRequest, score: Optional[dict] = None) -> dict:
+    try:
+        score = score if score is not None else (await score_repo_requests([data]))[0]
+        local = repo_local_fields(score)
+        with stage_seconds.time(endpoint="repo", stage="prompt_build"):
+            prompt, trimmed = await asyncio.to_thread(build_repo_prompt, data, local)
+        ask = lambda p: llm.complete(p, endpoint="repo", max_tokens=700, temperature=0.7)
+        content = await ask(prompt)
+        if content:
             try:
-                if '{' in content and '}' in content:
-                    json_start = content.find('{')
-                    json_end = content.rfind('}') + 1
-                    json_str = content[json_start:json_end]
-                    return json.loads(json_str)
+                result = await structured_output(
+                    "repo", prompt, content, RepoAnalysisResponse, lambda: repo_fallback(data, score), ask, local
+                )
+                if result is not None:
+                    result["trimmed_sections"] = trimmed
+                    await store_repo_fragment(data, result)
+                    return result
+            except Exception as parse_error:
+                logger.warning(f"Repo JSON parsing failed: {parse_error}")
+        logger.warning("Repo AI response missing or invalid, using fallback.")
+    except Exception as e:
+        logger.error(f"Repo analysis error: {str(e)}")
+        logger.warning("Repo AI analysis failed, using fallback.")
+
+    parse_stats.record("repo", "fallback")
+    return repo_fallback(data, score)
+
+async def analyze_learning_progress(goal_title: str, category: str, progress: str, description: Optional[str] = None, chat_history: Optional[list] = None, summary: Optional[str] = None) -> dict:
+    try:
+        with stage_seconds.time(endpoint="goal", stage="prompt_build"):
+            prompt, trimmed = await asyncio.to_thread(build_goal_prompt, goal_title, category, progress, description, chat_history, summary)
+        ask = lambda p: llm.complete(p, endpoint="goal", max_tokens=500, temperature=0.7)
+        content = await ask(prompt)
+        if content:
+            try:
+                result = await structured_output(
+                    "goal", prompt, content, LearningAnalysisResponse, lambda: goal_fallback(goal_title, category), ask
+                )
+                if result is not None:
+                    result["trimmed_sections"] = trimmed
+                    return result
             except:
                 pass
-        return {
-            "suggestions": [
-                f"Break down {goal_title} into smaller daily tasks",
-                f"Practice {category} concepts for 30 minutes daily",
-                "Join online communities for peer support"
-            ],
-            "next_steps": [
-                "Review current progress and identify gaps",
-                "Set specific weekly milestones",
-                "Find practice projects"
-            ],
-            "estimated_time": "2-4 weeks with consistent practice",
-            "resources": [
-                "Official documentation",
-                "YouTube tutorials",
-                "Practice coding platforms"
-            ]
-        }
+        parse_stats.record("goal", "fallback")
+        return goal_fallback(goal_title, category)
     except Exception as e:
         logger.error(f"AI analysis error: {str(e)}")
-        return {
-            "suggestions": ["Keep practicing consistently", "Break complex topics into smaller parts"],
-            "next_steps": ["Review fundamentals", "Build a small project"],
-            "estimated_time": "Varies based on complexity",
-            "resources": ["Documentation", "Online tutorials"]
-        }
+        parse_stats.record("goal", "fallback")
+        return goal_fallback()
 
-@app.post("/analyze-dev-profile", response_model=DevAnalysisResponse)
-async def analyze_developer_profile_endpoint(request: DevAnalysisRequest):
+def goal_summarizer(goal_title: str) -> Callable[[str, List[dict]], Awaitable[Optional[str]]]:
+    return lambda summary, turns: llm.complete(
+        build_summary_prompt(goal_title, summary, turns), endpoint="goal", max_tokens=250, temperature=0.3
+    )
+
+def goal_similarity_partition(request: LearningAnalysisRequest) -> str:
+    # Only goals on the same subject are compared at all; "Learn React" must not answer "Learn React hooks".
+    return f"{request.category}\n{goal_key(request.goal_title)}"
+
+def goal_similarity_fields(request: LearningAnalysisRequest) -> List[Tuple[str, float]]:
+    progress = "" if boilerplate(request.current_progress) else request.current_progress
+    return [(request.description or "", 1.0), (progress, 1.0)]
+
+def similar_goal_eligible(request: LearningAnalysisRequest) -> bool:
+    # Only first turns: once there is a conversation the answer depends on it.
+    return request.goal_id is None and not request.chat_history
+
+async def similar_goal(request: LearningAnalysisRequest) -> Optional[dict]:
+    if not similar_goal_eligible(request):
+        return None
+    found = similar_goals.lookup(goal_similarity_partition(request), goal_similarity_fields(request))
+    if found is None:
+        return None
+    result, similarity = found
+    logger.info(f"Answering goal '{request.goal_title}' from a stored analysis (similarity {similarity:.2f})")
+    return {**result, "source": "similar"}
+
+async def remember_goal(request: LearningAnalysisRequest, result: dict):
+    if similar_goal_eligible(request) and result.get("ai_success") and result.get("source", "ai") == "ai":
+        similar_goals.add(goal_similarity_partition(request), goal_similarity_fields(request), result)
+
+async def analyze_first_goal_turn(request: LearningAnalysisRequest) -> dict:
+    similar = await similar_goal(request)
+    if similar is not None:
+        return similar
+    analysis = await analyze_learning_progress(
+        request.goal_title,
+        request.category,
+        request.current_progress,
+        request.description,
+        request.chat_history
+    )
+    await remember_goal(request, analysis)
+    return analysis
+
+async def record_goal_turns(request: LearningAnalysisRequest, conversation: str, result: dict):
+    if not result.get("ai_success"):
+        return
+    turns = [{"role": "ai", "message": format_ai_turn(result)}]
+    if request.current_progress and request.current_progress.strip():
+        turns.insert(0, {"role": "user", "message": request.current_progress})
+    await conversations.append(conversation, turns, goal_summarizer(request.goal_title))
+
+async def analyze_goal_conversation(request: LearningAnalysisRequest, conversation: str) -> dict:
+    summary, history = await conversations.load(conversation, seed=request.chat_history)
+    analysis = await analyze_learning_progress(
+        request.goal_title,
+        request.category,
+        request.current_progress,
+        request.description,
+        history,
+        summary
+    )
+    await record_goal_turns(request, conversation, analysis)
+    return analysis
+
+async def stream_analysis(
+    namespace: str,
+    request: BaseModel,
+    build_prompt: Callable[[], Tuple[str, List[str]]],
+    max_tokens: int,
+    temperature: float,
+    response_model: Type[BaseModel],
+    fallback: Callable[[], dict],
+    on_result: Optional[Callable[[dict], Awaitable[None]]] = None,
+    local: Optional[dict] = None,
+    cache: bool = True,
+    lookup: Optional[Callable[[], Awaitable[Optional[dict]]]] = None
+) -> AsyncIterator[str]:
+    key = request_key(namespace, request)
+    cached = await response_cache.get(key) if cache else None
+    if cached is not None:
+        cached["source"] = "cache"
+    elif lookup is not None:
+        cached = await lookup()
+    if cached is not None:
+        record_analysis(namespace, cached)
+        for field, value in cached.items():
+            yield sse_event("field", {"name": field, "value": value})
+        yield sse_event("done", response_model(**cached).model_dump())
+        return
+
+    for field, value in (local or {}).items():
+        yield sse_event("field", {"name": field, "value": value})
+    parser = IncrementalJSONParser()
+    content = ""
+    result = None
+    trimmed: List[str] = []
+    try:
+        with stage_seconds.time(endpoint=namespace, stage="prompt_build"):
+            prompt, trimmed = await asyncio.to_thread(build_prompt)
+        async for token in llm.stream(prompt, endpoint=namespace, max_tokens=max_tokens, temperature=temperature):
+            content += token
+            yield sse_event("token", {"text": token})
+            for field, value in parser.feed(token):
+                yield sse_event("field", {"name": field, "value": value})
+        ask = lambda p: llm.complete(p, endpoint=namespace, max_tokens=max_tokens, temperature=temperature)
+        result = await structured_output(namespace, prompt, content, response_model, fallback, ask, local)
+    except Exception as e:
+        logger.error(f"Streaming {namespace} analysis error: {str(e)}")
+
+    try:
+        if not result:
+            raise ValueError("AI response missing or invalid")
+        result["trimmed_sections"] = trimmed
+        if on_result is not None:
+            await on_result(result)
+        final = response_model(**result)
+        if cache:
+            await response_cache.set(key, result)
+    except Exception as e:
+        logger.warning(f"Streaming {namespace} analysis using fallback: {str(e)}")
+        parse_stats.record(namespace, "fallback")
+        final = response_model(**fallback())
+    record_analysis(namespace, final.model_dump())
+    yield sse_event("done", final.model_dump())
+
+def sse_response(events: AsyncIterator[str], headers: Optional[dict] = None) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", **(headers or {})}
+    )
+
+async def shed_analysis(namespace: str, request: BaseModel, fallback: Callable[[], dict], cache: bool = True) -> dict:
+    # A shed request never waits on the LLM: the cached answer for the same request if there is one, else the fallback.
+    # Fallbacks score repo trees, so they are built off the event loop like any other tree scan.
+    cached = await response_cache.get(request_key(namespace, request)) if cache else None
+    result = {**(cached if cached is not None else await asyncio.to_thread(fallback)), "source": "shed"}
+    record_analysis(namespace, result)
+    return result
+
+async def shed_events(result: dict) -> AsyncIterator[str]:
+    for field, value in result.items():
+        yield sse_event("field", {"name": field, "value": value})
+    yield sse_event("done", result)
+
+def shed_response(shed: Tuple[str, int], response: BaseModel, stream: bool) -> Response:
+    reason, retry_after = shed
+    headers = {"Retry-After": str(retry_after), "X-Admission": reason}
+    if stream:
+        return sse_response(shed_events(response.model_dump()), headers)
+    return ORJSONResponse(response.model_dump(), headers=headers)
+
+def bearer_token(http_request: Request) -> Optional[str]:
+    authorization = http_request.headers.get("Authorization", "")
+    return authorization.split(" ", 1)[1] if " " in authorization else None
+
+def goal_conversation(request: LearningAnalysisRequest, http_request: Request) -> Optional[str]:
+    if not request.goal_id:
+        return None
     try:
-        loop = asyncio.get_event_loop()
-        analysis = await loop.run_in_executor(
-            executor,
-            analyze_developer_profile,
-            request
+        return conversation_key(request.goal_id, bearer_token(http_request))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def ingest_dev_request(github: GitHubIngestor, request: DevAnalysisRequest, token: Optional[str]) -> DevAnalysisRequest:
+    try:
+        return DevAnalysisRequest(**await github.ingest_profile(request.username, token))
+    except GitHubNotFound:
+        raise HTTPException(status_code=404, detail="GitHub user not found.")
+    except Exception as e:
+        logger.error(f"GitHub ingestion failed for {request.username}: {str(e)}")
+        raise HTTPException(status_code=502, detail="Failed to fetch GitHub data.")
+
+async def cancel_on_disconnect(http_request: Request, work: Awaitable[BaseModel]) -> BaseModel:
+    # Stop paying for the LLM call as soon as the client that asked for it has hung up.
+    task = asyncio.ensure_future(work)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                logger.info(f"Client disconnected from {http_request.url.path}, cancelling analysis")
+                raise HTTPException(status_code=499, detail="Client closed request.")
+    finally:
+        task.cancel()
+
+async def run_dev_profile_analysis(request: DevAnalysisRequest) -> DevAnalysisResponse:
+    try:
+        analysis = await response_cache.get_or_compute(
+            "dev-profile", request, lambda: analyze_developer_profile(request)
         )
         if not analysis or not isinstance(analysis, dict) or "summary" not in analysis:
             logger.error("AI analysis not available for developer profile.")
             raise HTTPException(status_code=503, detail="AI analysis not available for developer profile.")
-        logger.info(f"Final DevAnalysisResponse: {analysis}")
+        log_payload("Final DevAnalysisResponse", analysis)
+        record_analysis("dev-profile", analysis)
         return DevAnalysisResponse(**analysis)
     except Exception as e:
         logger.error(f"Developer profile analysis error: {str(e)}")
         logger.warning("Exception in endpoint, using fallback.")
+        record_analysis("dev-profile", {"source": "fallback", "ai_success": False})
         return DevAnalysisResponse(
             summary="No AI analysis available due to error. This is a fallback response.",
             skill_level="unknown",
@@ -421,23 +859,46 @@ async def analyze_developer_profile_endpoint(request: DevAnalysisRequest):
             source="fallback"
         )
 
-@app.post("/analyze-repo", response_model=RepoAnalysisResponse)
-async def analyze_repo_endpoint(request: RepoAnalysisRequest):
+@app.post("/analyze-dev-profile", response_model=DevAnalysisResponse)
+async def analyze_developer_profile_endpoint(request: DevAnalysisRequest, http_request: Request, stream: bool = False, ingest: Optional[str] = None, mode: Optional[str] = None):
+    shed = shed_decision(http_request.state)
+    if shed:
+        # Shed before ingestion too: fetching from GitHub is part of the load being refused.
+        result = await shed_analysis("dev-profile", request, lambda: dev_profile_fallback(request))
+        return shed_response(shed, DevAnalysisResponse(**result), stream)
+    if ingest == "server":
+        request = await ingest_dev_request(http_request.app.state.github, request, bearer_token(http_request))
+    elif ingest:
+        raise HTTPException(status_code=400, detail="Unsupported ingest mode.")
+    if mode == "fast":
+        record_analysis("dev-profile", {"source": "local", "ai_success": False})
+        scores = await score_repo_requests(request.repos[:5])
+        return DevAnalysisResponse(**{**dev_profile_fallback(request, scores=scores), "source": "local"})
+    if stream:
+        notes = await load_repo_notes(request)
+        local = dev_local_fields(request, notes)
+        return sse_response(stream_analysis(
+            "dev-profile", request, lambda: build_dev_profile_prompt(request, local, notes),
+            1200, 0.6, DevAnalysisResponse, lambda: dev_profile_fallback(request, local),
+            lambda result: merge_repo_notes(request, notes, result), local=local
+        ))
+    return await cancel_on_disconnect(http_request, run_dev_profile_analysis(request))
+
+async def run_repo_analysis(request: RepoAnalysisRequest) -> RepoAnalysisResponse:
     try:
-        loop = asyncio.get_event_loop()
-        analysis = await loop.run_in_executor(
-            executor,
-            analyze_repo_profile,
-            request
+        analysis = await response_cache.get_or_compute(
+            "repo", request, lambda: analyze_repo_profile(request)
         )
         if not analysis or not isinstance(analysis, dict) or "summary" not in analysis:
             logger.error("AI analysis not available for repository.")
             raise HTTPException(status_code=503, detail="AI analysis not available for repository.")
-        logger.info(f"Final RepoAnalysisResponse: {analysis}")
+        log_payload("Final RepoAnalysisResponse", analysis)
+        record_analysis("repo", analysis)
         return RepoAnalysisResponse(**analysis)
     except Exception as e:
         logger.error(f"Repo profile analysis error: {str(e)}")
         logger.warning("Exception in repo endpoint, using fallback.")
+        record_analysis("repo", {"source": "fallback", "ai_success": False})
         return RepoAnalysisResponse(
             summary="No AI analysis available due to error. This is a fallback response.",
             strengths=[],
@@ -450,30 +911,295 @@ async def analyze_repo_endpoint(request: RepoAnalysisRequest):
             source="fallback"
         )
 
-@app.post("/analyze-goal", response_model=LearningAnalysisResponse)
-async def analyze_goal_endpoint(request: LearningAnalysisRequest):
+@app.post("/analyze-repo", response_model=RepoAnalysisResponse)
+async def analyze_repo_endpoint(request: RepoAnalysisRequest, http_request: Request, stream: bool = False, mode: Optional[str] = None):
+    if mode == "fast":
+        record_analysis("repo", {"source": "local", "ai_success": False})
+        score = (await score_repo_requests([request]))[0]
+        return RepoAnalysisResponse(**{**repo_fallback(request, score), "source": "local"})
+    shed = shed_decision(http_request.state)
+    if shed:
+        result = await shed_analysis("repo", request, lambda: repo_fallback(request))
+        return shed_response(shed, RepoAnalysisResponse(**result), stream)
+    if stream:
+        score = (await score_repo_requests([request]))[0]
+        local = repo_local_fields(score)
+        return sse_response(stream_analysis(
+            "repo", request, lambda: build_repo_prompt(request, local),
+            700, 0.7, RepoAnalysisResponse, lambda: repo_fallback(request, score),
+            lambda result: store_repo_fragment(request, result), local=local
+        ))
+    return await cancel_on_disconnect(http_request, run_repo_analysis(request))
+
+async def analyze_repo_batch_item(index: int, item: RepoAnalysisRequest, score: dict, semaphore: asyncio.Semaphore) -> RepoBatchItem:
+    try:
+        async with semaphore:
+            analysis = await asyncio.wait_for(
+                response_cache.get_or_compute("repo", item, lambda: analyze_repo_profile(item, score)),
+                timeout=BATCH_ITEM_TIMEOUT
+            )
+        response = RepoAnalysisResponse(**analysis)
+    except Exception as e:
+        logger.warning(f"Batch repo analysis for {item.repo_name} failed, using fallback: {e!r}")
+        response = RepoAnalysisResponse(**repo_fallback(item, score))
+    record_analysis("repo", {"source": response.source, "ai_success": response.ai_success})
+    return RepoBatchItem(index=index, repo_name=item.repo_name, analysis=response)
+
+async def stream_repo_batch(request: RepoBatchRequest, scores: List[dict]) -> AsyncIterator[str]:
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    tasks = [
+        asyncio.ensure_future(analyze_repo_batch_item(i, item, score, semaphore))
+        for i, (item, score) in enumerate(zip(request.repos, scores))
+    ]
     try:
-        loop = asyncio.get_event_loop()
-        analysis = await loop.run_in_executor(
-            executor,
-            analyze_learning_progress,
-            request.goal_title,
-            request.category,
-            request.current_progress,
-            request.description,
-            request.chat_history
+        for finished in asyncio.as_completed(tasks):
+            item = await finished
+            yield item.model_dump_json() + "\n"
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def run_repo_batch(request: RepoBatchRequest, scores: List[dict]) -> RepoBatchResponse:
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    results = await asyncio.gather(*[
+        analyze_repo_batch_item(i, item, score, semaphore)
+        for i, (item, score) in enumerate(zip(request.repos, scores))
+    ])
+    return RepoBatchResponse(results=list(results))
+
+async def shed_repo_batch(shed: Tuple[str, int], request: RepoBatchRequest, scores: List[dict], stream: bool) -> Response:
+    results = [
+        RepoBatchItem(
+            index=i,
+            repo_name=item.repo_name,
+            analysis=RepoAnalysisResponse(**await shed_analysis("repo", item, lambda: repo_fallback(item, score)))
         )
+        for i, (item, score) in enumerate(zip(request.repos, scores))
+    ]
+    reason, retry_after = shed
+    headers = {"Retry-After": str(retry_after), "X-Admission": reason}
+    if stream:
+        return Response("".join(item.model_dump_json() + "\n" for item in results), media_type="application/x-ndjson", headers=headers)
+    return ORJSONResponse(RepoBatchResponse(results=results).model_dump(), headers=headers)
+
+async def score_and_run_repo_batch(request: RepoBatchRequest) -> RepoBatchResponse:
+    return await run_repo_batch(request, await score_repo_requests(request.repos))
+
+def check_batch_size(request: RepoBatchRequest):
+    if len(request.repos) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_ITEMS} repositories per batch.")
+
+@app.post("/analyze-repos", response_model=RepoBatchResponse)
+async def analyze_repos_endpoint(request: RepoBatchRequest, http_request: Request, stream: bool = False, mode: Optional[str] = None):
+    check_batch_size(request)
+    scores = await score_repo_requests(request.repos)
+    if mode == "fast":
+        record_analysis("repo", {"source": "local", "ai_success": False}, count=len(request.repos))
+        return RepoBatchResponse(results=[
+            RepoBatchItem(
+                index=i,
+                repo_name=item.repo_name,
+                analysis=RepoAnalysisResponse(**{**repo_fallback(item, score), "source": "local"})
+            )
+            for i, (item, score) in enumerate(zip(request.repos, scores))
+        ])
+    shed = shed_decision(http_request.state)
+    if shed:
+        return await shed_repo_batch(shed, request, scores, stream)
+    if stream:
+        return StreamingResponse(stream_repo_batch(request, scores), media_type="application/x-ndjson")
+    return await cancel_on_disconnect(http_request, run_repo_batch(request, scores))
+
+async def run_goal_analysis(request: LearningAnalysisRequest, conversation: Optional[str]) -> LearningAnalysisResponse:
+    try:
+        if conversation:
+            analysis = await analyze_goal_conversation(request, conversation)
+        else:
+            analysis = await response_cache.get_or_compute("goal", request, lambda: analyze_first_goal_turn(request))
         if not analysis or not isinstance(analysis, dict) or "suggestions" not in analysis:
             logger.error("AI analysis not available for goal.")
             raise HTTPException(status_code=503, detail="AI analysis not available for goal.")
-        logger.info(f"Final LearningAnalysisResponse: {analysis}")
+        log_payload("Final LearningAnalysisResponse", analysis)
+        record_analysis("goal", analysis)
         return LearningAnalysisResponse(**analysis)
     except Exception as e:
         logger.error(f"Goal analysis error: {str(e)}")
         logger.warning("Exception in goal endpoint, using fallback.")
+        record_analysis("goal", {"source": "fallback", "ai_success": False})
         return LearningAnalysisResponse(
             suggestions=["Keep practicing consistently", "Break complex topics into smaller parts"],
             next_steps=["Review fundamentals", "Build a small project"],
             estimated_time="Varies based on complexity",
-            resources=["Documentation", "Online tutorials"]
-        )
\ No newline at end of file
+            resources=["Documentation", "Online tutorials"],
+            ai_success=False,
+            source="fallback"
+        )
+
+@app.post("/analyze-goal", response_model=LearningAnalysisResponse)
+async def analyze_goal_endpoint(request: LearningAnalysisRequest, http_request: Request, stream: bool = False):
+    conversation = goal_conversation(request, http_request)
+    shed = shed_decision(http_request.state)
+    if shed:
+        # Conversational turns are neither served from the cache nor recorded when shed.
+        similar = await similar_goal(request)
+        result = await shed_analysis(
+            "goal", request, lambda: similar or goal_fallback(request.goal_title, request.category), cache=request.goal_id is None
+        )
+        return shed_response(shed, LearningAnalysisResponse(**result), stream)
+    if stream:
+        summary, history = None, request.chat_history
+        if conversation:
+            summary, history = await conversations.load(conversation, seed=request.chat_history)
+        return sse_response(stream_analysis(
+            "goal",
+            request,
+            lambda: build_goal_prompt(
+                request.goal_title,
+                request.category,
+                request.current_progress,
+                request.description,
+                history,
+                summary
+            ),
+            500,
+            0.7,
+            LearningAnalysisResponse,
+            lambda: goal_fallback(request.goal_title, request.category),
+            (lambda result: record_goal_turns(request, conversation, result)) if conversation else (lambda result: remember_goal(request, result)),
+            cache=request.goal_id is None,
+            lookup=lambda: similar_goal(request)
+        ))
+    return await cancel_on_disconnect(http_request, run_goal_analysis(request, conversation))
+
+def submit_job(kind: str, work: Callable[[], Awaitable[BaseModel]], deadline: Optional[float]) -> JobResponse:
+    async def run() -> dict:
+        return (await work()).model_dump()
+    try:
+        job = jobs.submit(kind, run, JOB_PRIORITIES[kind], deadline)
+    except QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    logger.info(f"Queued {kind} job {job.id} (priority {job.priority}, {jobs.queue_depth()} queued)")
+    return JobResponse(**job.to_dict())
+
+@app.post("/jobs/analyze-dev-profile", response_model=JobResponse, status_code=202)
+async def submit_dev_profile_job(request: DevAnalysisRequest, http_request: Request, ingest: Optional[str] = None, deadline: Optional[float] = Query(None, gt=0)):
+    if ingest and ingest != "server":
+        raise HTTPException(status_code=400, detail="Unsupported ingest mode.")
+    github = http_request.app.state.github
+    token = bearer_token(http_request)
+
+    async def work() -> DevAnalysisResponse:
+        data = await ingest_dev_request(github, request, token) if ingest == "server" else request
+        return await run_dev_profile_analysis(data)
+    return submit_job("analyze-dev-profile", work, deadline)
+
+@app.post("/jobs/analyze-repo", response_model=JobResponse, status_code=202)
+async def submit_repo_job(request: RepoAnalysisRequest, deadline: Optional[float] = Query(None, gt=0)):
+    return submit_job("analyze-repo", lambda: run_repo_analysis(request), deadline)
+
+@app.post("/jobs/analyze-repos", response_model=JobResponse, status_code=202)
+async def submit_repo_batch_job(request: RepoBatchRequest, deadline: Optional[float] = Query(None, gt=0)):
+    check_batch_size(request)
+    return submit_job(
+        "analyze-repos",
+        lambda: score_and_run_repo_batch(request),
+        deadline
+    )
+
+@app.post("/jobs/analyze-goal", response_model=JobResponse, status_code=202)
+async def submit_goal_job(request: LearningAnalysisRequest, http_request: Request, deadline: Optional[float] = Query(None, gt=0)):
+    conversation = goal_conversation(request, http_request)
+    return submit_job("analyze-goal", lambda: run_goal_analysis(request, conversation), deadline)
+
+@app.get("/jobs")
+async def job_stats():
+    return jobs.stats()
+
+@app.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str, wait: float = Query(0, ge=0)):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    await jobs.wait(job, min(wait, JOB_MAX_WAIT))
+    return JobResponse(**job.to_dict())
+
+@app.delete("/jobs/{job_id}", response_model=JobResponse)
+async def cancel_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    jobs.cancel(job)
+    return JobResponse(**job.to_dict())
+
+@registry.collector
+def collect_runtime_metrics():
+    llm_stats = llm.stats()
+    router_stats = llm_stats["router"]
+    job_stats = jobs.stats()
+    cache_stats = response_cache.stats()
+    fragment_stats = fragments.stats()
+    admission_stats = admission.stats()
+    similar_stats = similar_goals.stats()
+    queued = {priority: 0 for priority in set(JOB_PRIORITIES.values())}
+    queued.update(job_stats["queue_depth_by_priority"])
+    yield "devtracker_llm_in_flight", "gauge", "LLM calls currently running.", [
+        ({"endpoint": endpoint}, count) for endpoint, count in llm_stats["in_flight"].items()
+    ]
+    yield "devtracker_llm_waiting", "gauge", "LLM calls waiting for a concurrency slot.", [
+        ({"endpoint": endpoint}, count) for endpoint, count in llm_stats["waiting"].items()
+    ]
+    yield "devtracker_llm_ready", "gauge", "1 once the LLM client library is loaded.", [({}, int(llm_stats["ready"]))]
+    yield "devtracker_llm_route_error_rate", "gauge", "Rolling error rate per LLM route.", [
+        ({"route": name}, route["error_rate"]) for name, route in router_stats["routes"].items()
+    ]
+    yield "devtracker_llm_route_open", "gauge", "1 while the route's circuit breaker is not closed.", [
+        ({"route": name}, int(route["state"] != "closed")) for name, route in router_stats["routes"].items()
+    ]
+    yield "devtracker_llm_hedges_total", "counter", "Hedged second requests sent, and how many of them won.", [
+        ({"outcome": "sent"}, router_stats["hedges"]), ({"outcome": "won"}, router_stats["hedge_wins"])
+    ]
+    yield "devtracker_llm_timeouts_total", "counter", "LLM calls that hit their endpoint deadline.", [({}, router_stats["timeouts"])]
+    yield "devtracker_admission_total", "counter", "Admission decisions for /analyze-* requests; shed ones get a cached or fallback answer.", [
+        ({"decision": decision}, count) for decision, count in admission_stats["decisions"].items()
+    ]
+    yield "devtracker_admission_in_flight", "gauge", "Admitted /analyze-* requests still running.", [({}, admission_stats["in_flight"])]
+    yield "devtracker_job_queue_depth", "gauge", "Jobs waiting for a worker, by priority (lower runs first).", [
+        ({"priority": str(priority)}, count) for priority, count in sorted(queued.items())
+    ]
+    yield "devtracker_jobs_running", "gauge", "Jobs currently running.", [({}, job_stats["running"])]
+    yield "devtracker_job_wait_seconds", "gauge", "Queue wait of recently started jobs.", [
+        ({"quantile": "0.5"}, job_stats["wait_seconds_p50"]), ({"quantile": "0.95"}, job_stats["wait_seconds_p95"])
+    ]
+    yield "devtracker_jobs_finished_total", "counter", "Finished jobs by final status.", [
+        ({"status": status}, count) for status, count in job_stats["finished"].items()
+    ]
+    yield "devtracker_response_cache_total", "counter", "Response cache lookups by result.", [
+        ({"result": name}, cache_stats[name]) for name in ("hits", "misses", "coalesced")
+    ]
+    yield "devtracker_response_cache_entries", "gauge", "Entries in the in-memory response cache.", [({}, cache_stats["entries"])]
+    yield "devtracker_repo_fragments_total", "counter", "Stored per-repo analyses reused (hits), missing (misses) or written (saved) by profile analyses.", [
+        ({"result": name}, fragment_stats[name]) for name in ("hits", "misses", "saved")
+    ]
+    yield "devtracker_similar_goal_total", "counter", "First-turn goal requests answered from a similar stored analysis (hits) or not (misses), and analyses stored or evicted.", [
+        ({"result": name}, similar_stats[name]) for name in ("hits", "misses", "stored", "evicted")
+    ]
+    yield "devtracker_similar_goal_entries", "gauge", "Analyses in the goal similarity index.", [({}, similar_stats["entries"])]
+    yield "devtracker_parse_outcomes_total", "counter", "How LLM replies were turned into responses.", [
+        ({"endpoint": endpoint, "outcome": outcome}, count)
+        for endpoint, counts in parse_stats.counts.items() for outcome, count in counts.items()
+    ]
+    yield "devtracker_fallback_rate", "gauge", "Share of LLM analyses that ended in the fallback.", [
+        ({"endpoint": endpoint}, parse_stats.fallback_rate(endpoint)) for endpoint in list(parse_stats.counts)
+    ]
+
+@app.get("/ready")
+async def ready():
+    # With LLM_STARTUP=lazy the client loads on the first analysis, so the process is ready as soon as it serves.
+    if llm.ready or LLM_STARTUP == "lazy":
+        return {"status": "ready", "llm": "loaded" if llm.ready else "lazy"}
+    status = "error" if llm.warmup_error else "starting"
+    return JSONResponse(status_code=503, content={"status": status, "llm": status, "error": llm.warmup_error})
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
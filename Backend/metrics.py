@@ -0,0 +1,170 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+import time
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+CHARS_BUCKETS = (256, 1024, 4096, 8192, 16384, 32768, 65536, 262144)
+
+# A collector returns (name, type, help, [(labels, value), ...]) for values that live elsewhere.
+Sample = Tuple[Dict[str, str], float]
+Collector = Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs: Iterable[Tuple[str, str]]) -> str:
+    body = ",".join(f'{name}="{_escape(value)}"' for name, value in pairs)
+    return "{" + body + "}" if body else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values: Dict[tuple, float] = defaultdict(float)
+
+    def inc(self, amount: float = 1, **labels):
+        self.values[tuple(str(labels[name]) for name in self.labels)] += amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_labels(zip(self.labels, key))} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets) + (float("inf"),)
+        self.counts: Dict[tuple, List[int]] = {}
+        self.sums: Dict[tuple, float] = defaultdict(float)
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labels)
+        counts = self.counts.get(key)
+        if counts is None:
+            counts = self.counts[key] = [0] * len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        self.sums[key] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, counts in sorted(self.counts.items()):
+            pairs = list(zip(self.labels, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(pairs + [('le', _number(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(pairs)} {_number(self.sums[key])}")
+            lines.append(f"{self.name}_count{_labels(pairs)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List = []
+        self.collectors: List[Collector] = []
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, help, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, labels, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def collector(self, collect: Collector) -> Collector:
+        self.collectors.append(collect)
+        return collect
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collect in self.collectors:
+            for name, kind, help, samples in collect():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(sorted(labels.items()))} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+request_seconds = registry.histogram(
+    "devtracker_http_request_duration_seconds", "HTTP request latency, including streamed bodies.", ("route", "method", "status")
+)
+stage_seconds = registry.histogram(
+    "devtracker_analysis_stage_seconds", "Time spent per analysis stage (prompt_build, llm_queue, llm_call, parse).", ("endpoint", "stage")
+)
+prompt_chars = registry.histogram(
+    "devtracker_llm_prompt_chars", "Characters sent to the LLM per call.", ("endpoint",), CHARS_BUCKETS
+)
+response_chars = registry.histogram(
+    "devtracker_llm_response_chars", "Characters received from the LLM per call.", ("endpoint",), CHARS_BUCKETS
+)
+analysis_results = registry.counter(
+    "devtracker_analysis_results_total", "Analyses returned, by where the result came from (ai, partial, cache, local, fallback).", ("endpoint", "source", "ai_success")
+)
+
+
+def record_analysis(endpoint: str, result: dict, count: int = 1):
+    ai_success = str(bool(result.get("ai_success", True))).lower()
+    analysis_results.inc(count, endpoint=endpoint, source=result.get("source", "ai"), ai_success=ai_success)
+
+
+class MetricsMiddleware:
+    # Plain ASGI rather than BaseHTTPMiddleware so streaming and disconnect detection are left untouched.
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            request_seconds.observe(
+                time.perf_counter() - start,
+                route=getattr(route, "path", "unmatched"),
+                method=scope["method"],
+                status=status
+            )
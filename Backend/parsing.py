@@ -0,0 +1,247 @@
+from collections import defaultdict
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from typing import Any, Awaitable, Callable, Collection, Dict, Iterator, List, Optional, Tuple, Type
+from metrics import stage_seconds
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Response fields that are set by the backend, never by the model.
+META_FIELDS = {"ai_success", "source", "trimmed_sections"}
+# '{' positions tried per reply before giving up; chatter rarely has more than a few braces before the JSON.
+JSON_MAX_CANDIDATES = 16
+
+_adapters: Dict[Tuple[Type[BaseModel], str], TypeAdapter] = {}
+
+
+def scan_json_object(content: str, start: int = 0) -> Optional[str]:
+    """Returns the first balanced {...} in content from `start`, or everything from its '{' if it never closes."""
+    start = content.find("{", start)
+    if start < 0:
+        return None
+    depth = 0
+    in_string = False
+    escape = False
+    for i in range(start, len(content)):
+        char = content[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            depth += 1
+        elif char in "}]":
+            depth -= 1
+            if depth == 0:
+                return content[start:i + 1]
+    return content[start:]
+
+
+def _close(text: str, stack: List[str]) -> str:
+    return text + "".join(reversed(stack))
+
+
+def repair_json(text: str) -> Optional[Any]:
+    out: List[str] = []
+    stack: List[str] = []
+    safe: Optional[Tuple[int, List[str]]] = None
+    in_string = False
+    escape = False
+    for char in text:
+        if in_string:
+            out.append(char)
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]":
+            # Drop trailing commas such as [1, 2,] or {"a": 1,}.
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            if stack:
+                stack.pop()
+            out.append(char)
+            safe = (len(out), list(stack))
+            continue
+        elif char == "," and stack:
+            safe = (len(out), list(stack))
+        out.append(char)
+
+    # First try to keep everything, closing whatever was left open.
+    tail = "".join(out)
+    if in_string:
+        tail = (tail[:-1] if escape else tail) + '"'
+    tail = tail.rstrip().rstrip(",").rstrip()
+    if tail.endswith(":"):
+        tail += " null"
+    # A number or literal at the very end may have been cut mid-token ("4" of "40"), so it is not kept.
+    unfinished = not in_string and (tail[-1:].isalnum() or tail[-1:] in (".", "-", "+"))
+    if not unfinished:
+        try:
+            return json.loads(_close(tail, stack))
+        except ValueError:
+            pass
+    # Otherwise cut back to the last point where a value was complete.
+    if safe is not None:
+        try:
+            return json.loads(_close("".join(out[:safe[0]]), safe[1]))
+        except ValueError:
+            pass
+    return None
+
+
+def json_candidates(content: str) -> Iterator[str]:
+    # Every '{' in turn: chatter such as "use the {name} format" can come before the real object.
+    start = content.find("{")
+    for _ in range(JSON_MAX_CANDIDATES):
+        if start < 0:
+            return
+        yield scan_json_object(content, start)
+        start = content.find("{", start + 1)
+
+
+def parse_llm_json(content: str, model: Optional[Type[BaseModel]] = None) -> Tuple[Optional[dict], bool]:
+    """Returns the first non-empty object in content and whether it needed repair.
+
+    With a model, objects that have none of its fields (an example, say) are passed over
+    for the first one that has; only if none has any is the first object returned.
+    """
+    repaired = False
+    first: Optional[Tuple[dict, bool]] = None
+    for candidate in json_candidates(content):
+        try:
+            result = json.loads(candidate)
+            fixed = False
+        except ValueError:
+            result = repair_json(candidate)
+            fixed = True
+        if isinstance(result, dict) and result:
+            if model is None or not result.keys().isdisjoint(model.model_fields):
+                return result, fixed
+            first = first or (result, fixed)
+        repaired = repaired or fixed
+    return first if first is not None else (None, repaired)
+
+
+def _adapter(model: Type[BaseModel], name: str) -> TypeAdapter:
+    key = (model, name)
+    if key not in _adapters:
+        _adapters[key] = TypeAdapter(model.model_fields[name].annotation)
+    return _adapters[key]
+
+
+def validate_fields(data: dict, model: Type[BaseModel], skip: Collection[str] = ()) -> Tuple[dict, List[str]]:
+    valid = {}
+    missing = []
+    for name in model.model_fields:
+        if name in META_FIELDS or name in skip:
+            continue
+        if data.get(name) is None:
+            missing.append(name)
+            continue
+        try:
+            valid[name] = _adapter(model, name).validate_python(data[name])
+        except ValidationError:
+            missing.append(name)
+    return valid, missing
+
+
+def followup_prompt(prompt: str, answered: dict, missing: List[str]) -> str:
+    return (
+        f"{prompt}\n\n"
+        "You already answered part of this request:\n"
+        f"{json.dumps(answered, ensure_ascii=False)}\n"
+        f"Reply ONLY with a JSON object containing the missing fields: {', '.join(missing)}. "
+        "Use exactly the format described above for those fields."
+    )
+
+
+class ParseStats:
+    OUTCOMES = ("clean", "repaired", "followup", "partial", "fallback")
+
+    def __init__(self):
+        self.counts: Dict[str, Dict[str, int]] = defaultdict(lambda: {outcome: 0 for outcome in self.OUTCOMES})
+
+    def record(self, endpoint: str, outcome: str):
+        self.counts[endpoint][outcome] += 1
+
+    def fallback_rate(self, endpoint: str) -> float:
+        counts = self.counts[endpoint]
+        total = sum(counts.values())
+        return counts["fallback"] / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {
+            endpoint: {**counts, "fallback_rate": round(self.fallback_rate(endpoint), 4)}
+            for endpoint, counts in self.counts.items()
+        }
+
+
+parse_stats = ParseStats()
+
+
+async def structured_output(
+    endpoint: str,
+    prompt: str,
+    content: str,
+    model: Type[BaseModel],
+    fallback: Callable[[], dict],
+    ask: Optional[Callable[[str], Awaitable[Optional[str]]]] = None,
+    local: Optional[dict] = None
+) -> Optional[dict]:
+    local = local or {}
+    start = time.perf_counter()
+    data, repaired = parse_llm_json(content, model)
+    if data is None:
+        stage_seconds.observe(time.perf_counter() - start, endpoint=endpoint, stage="parse")
+        logger.warning(f"No JSON object found in {endpoint} response")
+        return None
+    valid, missing = validate_fields(data, model, skip=local)
+    stage_seconds.observe(time.perf_counter() - start, endpoint=endpoint, stage="parse")
+    outcome = "repaired" if repaired else "clean"
+
+    if missing and valid and ask is not None:
+        logger.info(f"{endpoint} response missing {missing}, requesting only those fields")
+        try:
+            extra_content = await ask(followup_prompt(prompt, valid, missing))
+            with stage_seconds.time(endpoint=endpoint, stage="parse"):
+                extra, _ = parse_llm_json(extra_content or "", model)
+                extra_valid, _ = validate_fields(extra, model, skip=local) if extra else ({}, [])
+            if extra:
+                valid.update({name: value for name, value in extra_valid.items() if name in missing})
+                missing = [name for name in missing if name not in valid]
+                outcome = "followup"
+        except Exception as e:
+            logger.warning(f"Follow-up for {endpoint} missing fields failed: {e}")
+
+    if not valid:
+        return None
+    required_missing = [name for name in missing if model.model_fields[name].is_required()]
+    if missing:
+        logger.warning(f"{endpoint} response still missing {missing}, filling from fallback")
+    if required_missing:
+        outcome = "partial"
+    parse_stats.record(endpoint, outcome)
+
+    # Locally computed fields are authoritative; the model only writes the narrative.
+    # The fallback is only built when it has gaps to fill, since building it can rescore every repo.
+    result = {**(fallback() if missing else {}), **valid, **local}
+    result["ai_success"] = True
+    result["source"] = "partial" if required_missing else "ai"
+    return result
@@ -0,0 +1,122 @@
+from collections import Counter
+from itertools import compress
+from typing import List, Optional, Tuple
+from sampler import sample_code
+from scoring import tree_columns
+import os
+import numpy as np
+
+# Rough heuristic for English/code text; good enough to keep prompts bounded
+# without pulling a tokenizer into the request path.
+CHARS_PER_TOKEN = 4
+
+PROMPT_PROFILE_TOKENS = int(os.environ.get("PROMPT_PROFILE_TOKENS", "250"))
+PROMPT_PROFILE_README_TOKENS = int(os.environ.get("PROMPT_PROFILE_README_TOKENS", "125"))
+PROMPT_TREE_TOKENS = int(os.environ.get("PROMPT_TREE_TOKENS", "300"))
+PROMPT_README_TOKENS = int(os.environ.get("PROMPT_README_TOKENS", "75"))
+PROMPT_CODE_TOKENS = int(os.environ.get("PROMPT_CODE_TOKENS", "250"))
+PROMPT_COMMITS_TOKENS = int(os.environ.get("PROMPT_COMMITS_TOKENS", "150"))
+PROMPT_PROGRESS_TOKENS = int(os.environ.get("PROMPT_PROGRESS_TOKENS", "300"))
+PROMPT_CHAT_TOKENS = int(os.environ.get("PROMPT_CHAT_TOKENS", "800"))
+TREE_LISTING_DEPTH = int(os.environ.get("TREE_LISTING_DEPTH", "2"))
+TREE_LISTING_ENTRIES = int(os.environ.get("TREE_LISTING_ENTRIES", "40"))
+
+SIZE_BUCKETS = [(1_000, "<1KB"), (10_000, "1-10KB"), (100_000, "10-100KB"), (float("inf"), ">100KB")]
+SIZE_LIMITS = np.array([limit for limit, _ in SIZE_BUCKETS])
+
+
+def token_chars(tokens: int) -> int:
+    return tokens * CHARS_PER_TOKEN
+
+
+def summarize_tree(tree: list, max_depth: int = TREE_LISTING_DEPTH, max_entries: int = TREE_LISTING_ENTRIES) -> Tuple[str, bool]:
+    columns = tree_columns(tree)
+    is_file = ~columns.is_dir
+    file_paths = list(compress(columns.paths, is_file))
+    file_sizes = columns.sizes[is_file]
+    files, dirs = len(file_paths), int(columns.is_dir.sum())
+
+    # split("/", max_depth) leaves the file name, or the rest of a deeper path, as the last part.
+    parents = ["/".join(path.split("/", max_depth)[:-1]) or "." for path in file_paths]
+    directories: dict = {}
+    inverse = np.fromiter((directories.setdefault(parent, len(directories)) for parent in parents), dtype=np.int64, count=files)
+    dir_files = np.bincount(inverse, minlength=len(directories))
+    dir_bytes = np.bincount(inverse, weights=file_sizes, minlength=len(directories))
+    names = list(directories)
+    names_only = [path.rpartition("/")[2] for path in file_paths]
+    extensions = Counter(name.rpartition(".")[2].lower() if "." in name.lstrip(".") else "(none)" for name in names_only)
+    sizes = np.bincount(np.searchsorted(SIZE_LIMITS, file_sizes, side="right"), minlength=len(SIZE_BUCKETS))
+
+    listing: List[str] = []
+    for i, path in enumerate(columns.paths):
+        if path.count("/") < max_depth:
+            listing.append(path + ("/" if columns.is_dir[i] else ""))
+            if len(listing) == max_entries:
+                break
+    scanned = len(columns.paths) == columns.total
+    # Complete only if every entry made it into the listing.
+    complete = scanned and len(listing) == len(columns.paths)
+
+    lines = [f"{files} files, {dirs} directories, {int(file_sizes.sum())} bytes" + ("" if scanned else f" (first {len(columns.paths)} of {columns.total} entries)")]
+    if files:
+        # Most files first, ties in the order the directories first appear.
+        lines.append("By directory: " + ", ".join(
+            f"{names[i]}/ ({dir_files[i]} files, {int(dir_bytes[i])} B)" for i in np.argsort(-dir_files, kind="stable")[:12]
+        ))
+        lines.append("By extension: " + ", ".join(f".{ext} {count}" if ext != "(none)" else f"{ext} {count}" for ext, count in extensions.most_common(10)))
+    lines.append("By size: " + ", ".join(f"{label} {count}" for (_, label), count in zip(SIZE_BUCKETS, sizes)))
+    lines.append(f"Listing (depth <= {max_depth}):")
+    lines.extend(listing)
+    if not complete:
+        lines.append("...")
+    return "\n".join(lines), complete
+
+
+class PromptBudget:
+    def __init__(self):
+        self.trimmed: List[str] = []
+
+    def _mark(self, name: str):
+        if name not in self.trimmed:
+            self.trimmed.append(name)
+
+    def fit(self, name: str, text: Optional[str], max_tokens: int, marker: str = "\n...\n[truncated]") -> str:
+        if not text:
+            return ""
+        max_chars = token_chars(max_tokens)
+        if len(text) <= max_chars:
+            return text
+        self._mark(name)
+        return text[:max_chars] + marker
+
+    def tree(self, name: str, tree: Optional[list], max_tokens: int = PROMPT_TREE_TOKENS) -> str:
+        if not tree:
+            return ""
+        summary, complete = summarize_tree(tree)
+        if not complete:
+            self._mark(name)
+        return self.fit(name, summary, max_tokens)
+
+    def code(self, name: str, code: Optional[str], max_tokens: int, tree: Optional[list] = None, languages: Optional[dict] = None) -> str:
+        if not code:
+            return ""
+        sample, complete = sample_code(code, token_chars(max_tokens), tree, languages)
+        if not complete:
+            self._mark(name)
+        return self.fit(name, sample, max_tokens)
+
+    def join(self, name: str, items: List[str], separator: str, max_tokens: int) -> str:
+        # Keeps whole items from the end (the most recent ones) rather than cutting mid-item.
+        max_chars = token_chars(max_tokens)
+        kept: List[str] = []
+        used = 0
+        for item in reversed(items):
+            if kept and used + len(item) + len(separator) > max_chars:
+                self._mark(name)
+                break
+            if len(item) > max_chars:
+                self._mark(name)
+                item = item[:max_chars]
+            kept.append(item)
+            used += len(item) + len(separator)
+        return separator.join(reversed(kept))
@@ -0,0 +1,329 @@
+from collections import defaultdict, deque
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+import asyncio
+import inspect
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+LLM_MODEL = os.environ.get("LLM_MODEL", "gpt-4o")
+# Comma separated "model" or "Provider:model" entries, tried in order.
+LLM_ROUTES = os.environ.get("LLM_ROUTES", "")
+LLM_ENDPOINT_DEADLINES = {
+    "dev-profile": float(os.environ.get("LLM_DEV_PROFILE_DEADLINE", "90")),
+    "repo": float(os.environ.get("LLM_REPO_DEADLINE", "60")),
+    "goal": float(os.environ.get("LLM_GOAL_DEADLINE", "30")),
+}
+LLM_DEFAULT_DEADLINE = float(os.environ.get("LLM_DEFAULT_DEADLINE", "60"))
+LLM_LATENCY_WINDOW = int(os.environ.get("LLM_LATENCY_WINDOW", "100"))
+LLM_HEDGE_QUANTILE = float(os.environ.get("LLM_HEDGE_QUANTILE", "0.9"))
+LLM_HEDGE_MIN_SAMPLES = int(os.environ.get("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_BREAKER_WINDOW = int(os.environ.get("LLM_BREAKER_WINDOW", "20"))
+LLM_BREAKER_MIN_CALLS = int(os.environ.get("LLM_BREAKER_MIN_CALLS", "5"))
+LLM_BREAKER_ERROR_RATE = float(os.environ.get("LLM_BREAKER_ERROR_RATE", "0.5"))
+LLM_BREAKER_COOLDOWN = float(os.environ.get("LLM_BREAKER_COOLDOWN", "30"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class NoRouteAvailable(Exception):
+    pass
+
+
+def parse_routes(spec: str) -> List[Tuple[Optional[str], str]]:
+    routes = []
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        provider, _, model = entry.rpartition(":")
+        routes.append((provider or None, model))
+    return routes
+
+
+class Route:
+    def __init__(self, client, model: str, provider: Optional[str] = None):
+        self.client = client
+        self.model = model
+        self.provider = provider
+        self.name = f"{provider}:{model}" if provider else model
+        self.latencies: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=LLM_LATENCY_WINDOW))
+        self.outcomes: Deque[bool] = deque(maxlen=LLM_BREAKER_WINDOW)
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probing = False
+        self.requests = 0
+        self.failures = 0
+
+    def _create(self, prompt: str, max_tokens: int, temperature: float, stream: bool = False):
+        kwargs = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+        }
+        if self.provider:
+            kwargs["provider"] = self.provider
+        if stream:
+            kwargs["stream"] = True
+        return self.client.chat.completions.create(**kwargs)
+
+    async def complete(self, prompt: str, max_tokens: int, temperature: float) -> str:
+        response = await self._create(prompt, max_tokens, temperature)
+        content = response.choices[0].message.content if response and response.choices else None
+        if not content:
+            raise ValueError(f"Empty response from {self.name}")
+        return content
+
+    async def stream(self, prompt: str, max_tokens: int, temperature: float) -> AsyncIterator[str]:
+        response = self._create(prompt, max_tokens, temperature, stream=True)
+        if inspect.isawaitable(response):
+            response = await response
+        async for chunk in response:
+            if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    def available(self) -> bool:
+        if self.state == OPEN and time.monotonic() - self.opened_at >= LLM_BREAKER_COOLDOWN:
+            self.state = HALF_OPEN
+            self.probing = False
+        # Half-open lets exactly one probe through; its outcome closes or reopens the breaker.
+        return self.state == CLOSED or self.state == HALF_OPEN and not self.probing
+
+    def acquire(self) -> bool:
+        # Checked again at launch: another call may have taken the half-open probe since candidates() ran.
+        if not self.available():
+            return False
+        if self.state == HALF_OPEN:
+            self.probing = True
+        return True
+
+    def record(self, endpoint: str, latency: float, ok: bool):
+        self.requests += 1
+        self.outcomes.append(ok)
+        if ok:
+            self.latencies[endpoint].append(latency)
+        else:
+            self.failures += 1
+        if self.state == HALF_OPEN:
+            if ok:
+                logger.info(f"LLM route {self.name} recovered, closing breaker")
+                self.state = CLOSED
+                self.outcomes.clear()
+            else:
+                self._open()
+        elif self.state == CLOSED and len(self.outcomes) >= LLM_BREAKER_MIN_CALLS and self.error_rate() >= LLM_BREAKER_ERROR_RATE:
+            self._open()
+
+    def release_probe(self):
+        # A cancelled probe (e.g. it lost a hedge) says nothing about health; let another one through.
+        if self.state == HALF_OPEN:
+            self.probing = False
+
+    def _open(self):
+        logger.warning(f"LLM route {self.name} failing ({self.error_rate():.0%} errors), opening breaker for {LLM_BREAKER_COOLDOWN}s")
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.probing = False
+
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def quantile(self, endpoint: str, q: float) -> Optional[float]:
+        samples = self.latencies.get(endpoint)
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+    def hedge_delay(self, endpoint: str) -> Optional[float]:
+        samples = self.latencies.get(endpoint)
+        if not samples or len(samples) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return self.quantile(endpoint, LLM_HEDGE_QUANTILE)
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "requests": self.requests,
+            "failures": self.failures,
+            "error_rate": round(self.error_rate(), 4),
+            "latency": {
+                endpoint: {"p50": round(self.quantile(endpoint, 0.5), 3), "p90": round(self.quantile(endpoint, 0.9), 3)}
+                for endpoint, samples in self.latencies.items() if samples
+            },
+        }
+
+
+class LLMRouter:
+    def __init__(self, routes: List[Route], deadlines: Optional[Dict[str, float]] = None):
+        if not routes:
+            raise ValueError("LLMRouter needs at least one route")
+        self.routes = routes
+        self.deadlines = dict(deadlines if deadlines is not None else LLM_ENDPOINT_DEADLINES)
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.timeouts = 0
+
+    @classmethod
+    def from_env(cls, client) -> "LLMRouter":
+        spec = parse_routes(LLM_ROUTES) or [(None, LLM_MODEL)]
+        return cls([Route(client, model, provider) for provider, model in spec])
+
+    def deadline(self, endpoint: str) -> float:
+        return self.deadlines.get(endpoint, LLM_DEFAULT_DEADLINE)
+
+    def candidates(self) -> List[Route]:
+        routes = [route for route in self.routes if route.available()]
+        if not routes:
+            raise NoRouteAvailable("All LLM routes are failing, circuit breakers open")
+        return routes
+
+    async def _attempt(self, route: Route, endpoint: str, prompt: str, max_tokens: int, temperature: float) -> str:
+        start = time.monotonic()
+        try:
+            content = await route.complete(prompt, max_tokens, temperature)
+        except asyncio.CancelledError:
+            route.release_probe()
+            raise
+        except Exception:
+            route.record(endpoint, time.monotonic() - start, False)
+            raise
+        route.record(endpoint, time.monotonic() - start, True)
+        return content
+
+    async def complete(
+        self,
+        prompt: str,
+        endpoint: str,
+        max_tokens: int,
+        temperature: float,
+        extra_slot: Optional[Callable[[], Awaitable[Optional[Callable[[], None]]]]] = None
+    ) -> str:
+        # The caller holds a concurrency slot for the first attempt. A hedge takes its own from
+        # extra_slot (its release, or None if none is free); a failover reuses the failed attempt's.
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        end = start + self.deadline(endpoint)
+        queue = self.candidates()
+        # With a single healthy route the hedge goes to the same route again.
+        spare = queue[0] if len(queue) == 1 else None
+        pending: Dict[asyncio.Task, Route] = {}
+        hedge: Optional[asyncio.Task] = None
+        releases: Dict[asyncio.Task, Callable[[], None]] = {}
+        last_error: Optional[BaseException] = None
+
+        def launch(route: Route, release: Optional[Callable[[], None]] = None) -> Optional[asyncio.Task]:
+            if not route.acquire():
+                return None
+            task = asyncio.ensure_future(self._attempt(route, endpoint, prompt, max_tokens, temperature))
+            pending[task] = route
+            if release is not None:
+                releases[task] = release
+            return task
+
+        def launch_next(release: Optional[Callable[[], None]] = None) -> Optional[asyncio.Task]:
+            while queue:
+                task = launch(queue.pop(0), release)
+                if task is not None:
+                    return task
+            return None
+
+        if launch_next() is None:
+            raise NoRouteAvailable("All LLM routes are failing, circuit breakers open")
+        hedge_delay = next(iter(pending.values())).hedge_delay(endpoint)
+        try:
+            while pending:
+                now = loop.time()
+                wake = end
+                if hedge is None and hedge_delay is not None and (queue or spare):
+                    wake = min(wake, start + hedge_delay)
+                done, _ = await asyncio.wait(list(pending), timeout=max(0.0, wake - now), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    route = pending.pop(task)
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedge_wins += 1
+                        return task.result()
+                    last_error = task.exception()
+                    logger.warning(f"LLM route {route.name} failed for {endpoint}: {last_error!r}")
+                    # Fail over straight away instead of waiting for the hedge timer.
+                    release = releases.pop(task, None)
+                    if launch_next(release) is None and release is not None:
+                        release()
+                if loop.time() >= end:
+                    break
+                if not done and hedge is None and hedge_delay is not None and loop.time() >= start + hedge_delay:
+                    # A hedge that queued for a slot would come too late to help, so it only runs if one is free now.
+                    release = await extra_slot() if extra_slot is not None else None
+                    if extra_slot is None or release is not None:
+                        hedge = launch_next(release) or (launch(spare, release) if spare is not None else None)
+                        if hedge is None and release is not None:
+                            release()
+                    if hedge is None:
+                        # Nothing can take a hedge (no free slot, or the spare is a half-open route whose probe is out).
+                        hedge_delay = None
+                    else:
+                        self.hedges += 1
+                        logger.info(f"LLM {endpoint} call exceeded p90 ({hedge_delay:.2f}s), hedging on {pending[hedge].name}")
+        finally:
+            for task in pending:
+                task.cancel()
+            for release in releases.values():
+                release()
+        if pending or last_error is None:
+            self.timeouts += 1
+            for route in pending.values():
+                route.record(endpoint, loop.time() - start, False)
+            raise asyncio.TimeoutError(f"LLM {endpoint} call exceeded its {self.deadline(endpoint)}s deadline")
+        raise last_error
+
+    async def stream(self, prompt: str, endpoint: str, max_tokens: int, temperature: float) -> AsyncIterator[str]:
+        loop = asyncio.get_running_loop()
+        end = loop.time() + self.deadline(endpoint)
+        last_error: Optional[BaseException] = None
+        for route in self.candidates():
+            if not route.acquire():
+                continue
+            start = loop.time()
+            iterator = route.stream(prompt, max_tokens, temperature).__aiter__()
+            started = False
+            try:
+                while True:
+                    try:
+                        token = await asyncio.wait_for(iterator.__anext__(), max(0.0, end - loop.time()))
+                    except StopAsyncIteration:
+                        break
+                    started = True
+                    yield token
+            except asyncio.CancelledError:
+                route.release_probe()
+                raise
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    self.timeouts += 1
+                route.record(endpoint, loop.time() - start, False)
+                # Tokens already went to the client, so only fail over before the first one.
+                if started:
+                    raise
+                last_error = e
+                logger.warning(f"LLM route {route.name} failed to stream {endpoint}: {e!r}")
+                continue
+            finally:
+                await iterator.aclose()
+            route.record(endpoint, loop.time() - start, True)
+            return
+        raise last_error or NoRouteAvailable("No LLM route produced a stream")
+
+    def stats(self) -> dict:
+        return {
+            "routes": {route.name: route.stats() for route in self.routes},
+            "deadlines": self.deadlines,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "timeouts": self.timeouts,
+        }
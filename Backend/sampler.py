@@ -0,0 +1,304 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import ast
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+from scoring import TEST_PATTERN
+
+SAMPLER_CACHE_SIZE = int(os.environ.get("SAMPLER_CACHE_SIZE", "4096"))
+SAMPLER_MAX_FILES = int(os.environ.get("SAMPLER_MAX_FILES", "12"))
+SAMPLER_AST_MAX_CHARS = 200_000  # larger Python files are skimmed instead of parsed
+SAMPLER_SPREAD = 3  # the budget is shared by at least this many files when there are that many
+SAMPLER_MIN_SHARE = 200
+LINE_CHARS = 160
+VALUE_CHARS = 60
+
+# The mobile client and server-side ingest both join files as "\n// --- <path> ---\n<content>".
+# Ingest sends outlines, not sources, and marks their paths so they are not outlined a second time.
+FILE_HEADER = re.compile(r"^// --- (.+?) ---$", re.M)
+OUTLINED = " [outline]"
+
+LANGUAGE_EXTENSIONS = {
+    "Python": (".py",),
+    "JavaScript": (".js", ".jsx", ".mjs"),
+    "TypeScript": (".ts", ".tsx"),
+    "Java": (".java",),
+    "Kotlin": (".kt",),
+    "Go": (".go",),
+    "Rust": (".rs",),
+    "C": (".c", ".h"),
+    "C++": (".cpp", ".cc", ".hpp", ".h"),
+    "C#": (".cs",),
+    "Ruby": (".rb",),
+    "PHP": (".php",),
+    "Swift": (".swift",),
+    "Objective-C": (".m", ".h"),
+    "Shell": (".sh",),
+    "Perl": (".pl",),
+}
+CODE_EXTENSIONS = tuple(sorted({ext for exts in LANGUAGE_EXTENSIONS.values() for ext in exts}))
+LOW_VALUE_EXTENSIONS = (".json", ".yml", ".yaml", ".md", ".txt", ".html", ".css", ".scss", ".lock")
+MANIFESTS = ("package.json", "pyproject.toml", "requirements.txt", "setup.py", "go.mod", "cargo.toml", "build.gradle", "pom.xml", "gemfile", "composer.json")
+ENTRY_POINTS = ("main", "app", "index", "server", "cli", "__main__", "__init__", "manage", "lib", "mod", "program", "api")
+SKIP_MARKERS = ("node_modules/", "vendor/", "third_party/", "dist/", "build/", ".min.", "migrations/", "__snapshots__/", "generated")
+
+DECLARATION = re.compile(
+    r"^\s*(?:export\s+)?(?:default\s+)?"
+    r"(?:(?:public|private|protected|internal|static|abstract|final|async|override|open|data|sealed|suspend|inline|virtual|unsafe|extern|pub(?:\([a-z]+\))?)\s+)*"
+    r"(?:class|interface|enum|struct|trait|impl|fn|func|fun|function|def|object|type|module|namespace|record|protocol|extension)\b"
+)
+ARROW_FUNCTION = re.compile(r"^\s*(?:export\s+)?(?:const|let|var)\s+\w+\s*(?::[^=]+)?=\s*(?:async\s+)?(?:\([^)]*\)|\w+)\s*=>")
+METHOD = re.compile(r"^\s*(?:(?:public|private|protected|internal|static|final|abstract|override|virtual|async|synchronized)\s+)+[\w<>\[\],.? ]+\s+\w+\s*\(")
+# TypeScript/JavaScript class members: `private foo(a: number): string {`, `async *items() {`, `get name() {`.
+CLASS_MEMBER = re.compile(
+    r"^\s*(?:(?:public|private|protected|static|readonly|async|override|abstract|declare|get|set)\s+)*\*?"
+    r"(?!(?:if|for|while|switch|catch|return|function|else|do|with|new|await|typeof|super|this)\b)[#$\w]+\??\s*(?:<[^>]*>)?\s*"
+    r"\((?:[^;]*\)\s*(?::\s*[^;={]+)?\s*\{|[^;)]*)\s*$"
+)
+IMPORT = re.compile(r"^\s*(?:import|from|using|require|#include|use|package)\b")
+
+_skeletons: "OrderedDict[str, str]" = OrderedDict()
+_skeletons_lock = threading.Lock()  # Outlines are built from ingest's worker threads and while building prompts
+
+
+def file_header(path: str, outlined: bool = False) -> str:
+    return f"\n// --- {path}{OUTLINED if outlined else ''} ---\n"
+
+
+def split_files(code: str) -> List[Tuple[str, str, bool]]:
+    """Returns (path, content, whether the content is already an outline) per file."""
+    headers = list(FILE_HEADER.finditer(code))
+    files = []
+    for i, match in enumerate(headers):
+        end = headers[i + 1].start() if i + 1 < len(headers) else len(code)
+        path = match.group(1).strip()
+        outlined = path.endswith(OUTLINED)
+        files.append((path[:-len(OUTLINED)] if outlined else path, code[match.end():end].strip("\n"), outlined))
+    return files
+
+
+def _extension(path: str) -> str:
+    name = path.rsplit("/", 1)[-1].lower()
+    return "." + name.rsplit(".", 1)[-1] if "." in name else ""
+
+
+def rank_file(path: str, size: int, languages: Optional[dict] = None) -> float:
+    """Higher is more worth showing: entry points and core modules in the repo's main languages, not vendored, test or config files."""
+    lowered = path.lower()
+    name = lowered.rsplit("/", 1)[-1]
+    ext = _extension(lowered)
+    if any(marker in lowered for marker in SKIP_MARKERS):
+        return -10.0
+    score = 0.0
+    if name in MANIFESTS:
+        score += 2.0
+    elif ext in CODE_EXTENSIONS:
+        score += 3.0
+    elif ext in LOW_VALUE_EXTENSIONS:
+        score -= 3.0
+    ranked_languages = [lang for lang, _ in sorted((languages or {}).items(), key=lambda item: -(item[1] if isinstance(item[1], (int, float)) else 0))]
+    for position, language in enumerate(ranked_languages[:3]):
+        if ext in LANGUAGE_EXTENSIONS.get(language, ()):
+            score += 3.0 - position
+            break
+    if name.rsplit(".", 1)[0] in ENTRY_POINTS:
+        score += 3.0
+    if TEST_PATTERN.search(lowered):
+        score -= 2.0
+    score -= 0.5 * lowered.count("/")
+    # Substantial files say more than stubs, but very large ones are usually generated or data.
+    if size > 100_000:
+        score -= 2.0
+    else:
+        score += 2.0 * min(1.0, math.log1p(size) / math.log1p(5_000))
+    return score
+
+
+def _first_line(text: Optional[str]) -> str:
+    return text.strip().splitlines()[0][:LINE_CHARS] if text and text.strip() else ""
+
+
+def _unparse(node) -> str:
+    return ast.unparse(node) if node is not None else ""
+
+
+def _value(node) -> str:
+    value = _unparse(node)
+    return value if len(value) <= VALUE_CHARS else value[:VALUE_CHARS - 3] + "..."
+
+
+def _outline_python(node, lines: List[str], depth: int):
+    indent = "    " * depth
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+        for decorator in node.decorator_list:
+            lines.append(f"{indent}@{_unparse(decorator)}"[:LINE_CHARS])
+        keyword = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+        returns = f" -> {_unparse(node.returns)}" if node.returns else ""
+        lines.append(f"{indent}{keyword} {node.name}({_unparse(node.args)}){returns}: ..."[:LINE_CHARS])
+        doc = _first_line(ast.get_docstring(node))
+        if doc:
+            lines.append(f'{indent}    """{doc}"""')
+    elif isinstance(node, ast.ClassDef):
+        for decorator in node.decorator_list:
+            lines.append(f"{indent}@{_unparse(decorator)}"[:LINE_CHARS])
+        bases = ", ".join([_unparse(base) for base in node.bases] + [_unparse(keyword) for keyword in node.keywords])
+        lines.append(f"{indent}class {node.name}({bases}):" if bases else f"{indent}class {node.name}:")
+        doc = _first_line(ast.get_docstring(node))
+        if doc:
+            lines.append(f'{indent}    """{doc}"""')
+        if depth < 2:
+            for child in node.body:
+                _outline_python(child, lines, depth + 1)
+    elif isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name):
+        value = f" = {_value(node.value)}" if node.value is not None else ""
+        lines.append(f"{indent}{node.target.id}: {_unparse(node.annotation)}{value}"[:LINE_CHARS])
+    elif isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+        name = node.targets[0].id
+        # Module constants and class attributes; ordinary module-level variables are noise.
+        if depth or name.isupper():
+            lines.append(f"{indent}{name} = {_value(node.value)}"[:LINE_CHARS])
+    elif depth == 0 and isinstance(node, ast.If) and "__main__" in _unparse(node.test):
+        lines.append("if __name__ == '__main__': ...")
+
+
+def python_skeleton(source: str) -> Optional[str]:
+    try:
+        module = ast.parse(source)
+    except (SyntaxError, ValueError, RecursionError):
+        return None
+    # Definitions first, then imports and constants, so a clipped outline loses the least telling lines.
+    lines, constants, imports = [], [], []
+    doc = _first_line(ast.get_docstring(module))
+    if doc:
+        lines.append(f'"""{doc}"""')
+    for node in module.body:
+        if isinstance(node, ast.Import):
+            imports.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            imports.append("." * node.level + (node.module or ""))
+        else:
+            _outline_python(node, constants if isinstance(node, (ast.Assign, ast.AnnAssign)) else lines, 0)
+    if imports:
+        lines.append(f"# imports: {', '.join(dict.fromkeys(imports))}"[:LINE_CHARS])
+    return "\n".join(lines + constants)
+
+
+def skim(source: str) -> str:
+    """Counts imports and keeps declaration lines from the top two nesting levels, tracking braces as it goes."""
+    lines = []
+    imports = 0
+    depth = 0
+    in_comment = False
+    for raw in source.splitlines():
+        line = raw.strip()
+        if in_comment:
+            if "*/" in line:
+                in_comment = False
+            continue
+        if line.startswith("/*"):
+            in_comment = "*/" not in line
+            continue
+        if not line or line.startswith(("//", "*", "#!")) or (line.startswith("#") and not line.startswith("#include")):
+            continue
+        if IMPORT.match(line):
+            imports += 1
+        elif depth <= 1 and (DECLARATION.match(line) or ARROW_FUNCTION.match(line) or METHOD.match(line) or CLASS_MEMBER.match(line)):
+            signature = line.rstrip("{ ").rstrip()
+            lines.append(("    " * depth + signature)[:LINE_CHARS])
+        depth = max(0, depth + line.count("{") - line.count("}"))
+    if imports:
+        lines.insert(0, f"// {imports} imports")
+    return "\n".join(lines)
+
+
+def skim_text(path: str, source: str) -> str:
+    ext = _extension(path)
+    if ext == ".md":
+        return "\n".join(line for line in source.splitlines() if line.startswith("#"))[:LINE_CHARS * 5]
+    if ext == ".json":
+        try:
+            data = json.loads(source)
+        except ValueError:
+            return ""
+        if isinstance(data, dict):
+            # Manifests: show the dependency names, which say more about a project than anything else in them.
+            parts = [f"keys: {', '.join(list(data)[:15])}"]
+            for field in ("dependencies", "devDependencies", "require"):
+                if isinstance(data.get(field), dict):
+                    parts.append(f"{field}: {', '.join(list(data[field])[:20])}")
+            return "\n".join(parts)
+        return ""
+    if ext in (".yml", ".yaml", ".toml", ".txt"):
+        keys = [line.rstrip() for line in source.splitlines() if line and not line[0].isspace() and not line.startswith("#")]
+        return "\n".join(keys[:15])
+    return ""
+
+
+def skeleton(path: str, source: str) -> str:
+    key = hashlib.sha256(path.rsplit(".", 1)[-1].encode("utf-8") + b":" + source.encode("utf-8", errors="replace")).hexdigest()
+    with _skeletons_lock:
+        cached = _skeletons.get(key)
+        if cached is not None:
+            _skeletons.move_to_end(key)
+            return cached
+    ext = _extension(path)
+    result = None
+    if ext == ".py" and len(source) <= SAMPLER_AST_MAX_CHARS:
+        result = python_skeleton(source)
+    if result is None:
+        result = skim(source) if ext in CODE_EXTENSIONS or ext == ".py" else skim_text(path, source)
+    with _skeletons_lock:
+        _skeletons[key] = result
+        while len(_skeletons) > SAMPLER_CACHE_SIZE:
+            _skeletons.popitem(last=False)
+    return result
+
+
+def sample_code(code: str, max_chars: int, tree: Optional[list] = None, languages: Optional[dict] = None) -> Tuple[str, bool]:
+    """Outlines the highest ranked files within max_chars. Returns the sample and whether every file made it in."""
+    files = split_files(code)
+    if not files:
+        return code, len(code) <= max_chars
+    sizes: Dict[str, int] = {}
+    for entry in tree or []:
+        if isinstance(entry, dict) and isinstance(entry.get("size"), int):
+            sizes[entry.get("path") or ""] = entry["size"]
+    ranked = sorted(files, key=lambda file: -rank_file(file[0], sizes.get(file[0], len(file[1])), languages))
+    outlines = [
+        (path, outline) for path, outline in (
+            (path, source if outlined else skeleton(path, source)) for path, source, outlined in ranked[:SAMPLER_MAX_FILES]
+        ) if outline
+    ]
+    if not outlines:
+        # Nothing recognisable to outline; show the start of the best file rather than nothing.
+        path, source, _ = ranked[0]
+        return f"// --- {path} ---\n{source}"[:max_chars], False
+    parts: List[str] = []
+    remaining = max_chars
+    complete = len(outlines) == len(files)
+    for i, (path, outline) in enumerate(outlines):
+        header = f"// --- {path} ---\n"
+        # Spread what is left over the next few files so one large module cannot take the whole budget.
+        share = max(remaining // min(len(outlines) - i, SAMPLER_SPREAD), SAMPLER_MIN_SHARE) - len(header)
+        if share <= 0 or remaining < len(header) + SAMPLER_MIN_SHARE // 2:
+            complete = False
+            break
+        if len(outline) + 1 > share:
+            outline = clip(outline, min(share, remaining - len(header)))
+            complete = False
+        block = header + outline + "\n"
+        parts.append(block)
+        remaining -= len(block)
+    return "".join(parts), complete
+
+
+def clip(outline: str, limit: int) -> str:
+    marker = "\n..."
+    if limit <= len(marker):
+        return ""
+    cut = outline.rfind("\n", 0, limit - len(marker))
+    return (outline[:cut] if cut > 0 else outline[:limit - len(marker)]) + marker
@@ -0,0 +1,198 @@
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional
+import os
+import re
+import numpy as np
+
+POPULARITY_SATURATION = 1000  # stars + 2 * forks that maps to 100
+README_SATURATION = 5000      # README characters that earn the full README share
+VELOCITY_SATURATION = 200     # commits that map to 100
+TREE_SCAN_MAX_ENTRIES = int(os.environ.get("TREE_SCAN_MAX_ENTRIES", "50000"))
+
+CI_MARKERS = (".github/workflows/", ".travis.yml", ".gitlab-ci.yml", ".circleci/", "jenkinsfile", "azure-pipelines.yml")
+LINT_MARKERS = (".eslintrc", "eslint.config.", ".prettierrc", ".flake8", ".pylintrc", "ruff.toml", ".editorconfig", "pyproject.toml", "setup.cfg", ".rubocop.yml")
+TYPE_MARKERS = ("tsconfig.json", "mypy.ini", "py.typed")
+DOC_MARKERS = ("readme", "contributing", "changelog", "license", "code_of_conduct")
+TEST_PATTERN = re.compile(r"(^|/)(tests?|__tests__|spec)/|(^|/)test_[^/]+$|_test\.[a-z]+$|\.(test|spec)\.[a-z]+$")
+CONVENTIONAL_PATTERN = re.compile(r"^(feat|fix|docs|style|refactor|perf|test|build|ci|chore|revert)(\([^)]*\))?!?: ")
+LOW_EFFORT_MESSAGES = {"update", "updates", "fix", "fixes", "wip", "changes", "change", "commit", "minor", "stuff", ".", "test", "initial commit"}
+
+
+def _any_of(markers) -> str:
+    return "|".join(re.escape(marker) for marker in markers)
+
+
+# The same checks as on a single path, run over all of a tree's lowercased paths joined one per line.
+DOCS_DIR_LINE = re.compile(r"^docs(/|$)", re.M)
+DOC_FILE_LINE = re.compile(rf"^({_any_of(DOC_MARKERS)})[^/\n]*$", re.M)
+README_FILE_LINE = re.compile(r"^readme[^/\n]*$", re.M)
+TEST_LINE = re.compile(r"(^|/)(tests?|__tests__|spec)/|(^|/)test_[^/\n]+$|_test\.[a-z]+$|\.(test|spec)\.[a-z]+$", re.M)
+CI_LINE = re.compile(_any_of(CI_MARKERS))
+LINT_LINE = re.compile(rf"(^|/)({_any_of(LINT_MARKERS)})[^/\n]*$", re.M)
+TYPE_LINE = re.compile(rf"(^|/)({_any_of(TYPE_MARKERS)})$", re.M)
+
+
+class TreeColumns(NamedTuple):
+    paths: List[str]
+    text: str            # Lowercased paths, one per line
+    is_dir: np.ndarray
+    sizes: np.ndarray
+    total: int           # Entries in the tree, including any past the scan limit
+
+
+def tree_columns(tree: list, limit: int = TREE_SCAN_MAX_ENTRIES) -> TreeColumns:
+    rows = [
+        (entry.get("path") or "", entry.get("type") == "tree", entry.get("size") or 0)
+        for entry in tree[:limit] if isinstance(entry, dict)
+    ]
+    if not rows:
+        return TreeColumns([], "", np.zeros(0, dtype=bool), np.zeros(0), len(tree))
+    paths, kinds, sizes = (list(column) for column in zip(*rows))
+    text = "\n".join(paths)
+    if text.count("\n") != len(paths) - 1:
+        # Line-based scans need exactly one path per line.
+        paths = [path.replace("\n", " ") for path in paths]
+        text = "\n".join(paths)
+    return TreeColumns(paths, text.lower(), np.array(kinds, dtype=bool), np.array(sizes, dtype=float), len(tree))
+
+
+def _scan_start(text: str, markers) -> Optional[int]:
+    # str.find is far cheaper than a regex scan: start the regex just before the first literal marker, or skip it.
+    found = [i for i in (text.find(marker) for marker in markers) if i >= 0]
+    return max(min(found) - 1, 0) if found else None
+
+
+def _line_search(pattern: "re.Pattern", text: str, markers) -> int:
+    start = _scan_start(text, markers)
+    return int(start is not None and pattern.search(text, start) is not None)
+
+
+def _tree_signals(tree: Optional[list]) -> Dict[str, int]:
+    if not tree:
+        return {"has_tree": 0, "has_readme_file": 0, "doc_files": 0, "has_docs_dir": 0, "has_tests": 0, "has_ci": 0, "has_lint": 0, "has_types": 0}
+    text = tree_columns(tree).text
+    docs_start = _scan_start(text, DOC_MARKERS)
+    return {
+        "has_tree": 1,
+        "has_readme_file": _line_search(README_FILE_LINE, text, ("readme",)),
+        "doc_files": sum(1 for _ in DOC_FILE_LINE.finditer(text, docs_start)) if docs_start is not None else 0,
+        "has_docs_dir": _line_search(DOCS_DIR_LINE, text, ("docs",)),
+        "has_tests": _line_search(TEST_LINE, text, ("test", "spec")),
+        "has_ci": int(any(marker in text for marker in CI_MARKERS)),
+        "has_lint": _line_search(LINT_LINE, text, LINT_MARKERS),
+        "has_types": _line_search(TYPE_LINE, text, TYPE_MARKERS),
+    }
+
+
+def extract_features(repos: List[dict]) -> Dict[str, np.ndarray]:
+    signals = [_tree_signals(repo.get("tree")) for repo in repos]
+    features = {
+        "stars": np.array([repo.get("stars") or 0 for repo in repos], dtype=float),
+        "forks": np.array([repo.get("forks") or 0 for repo in repos], dtype=float),
+        "readme_len": np.array([len(repo.get("readme") or "") for repo in repos], dtype=float),
+        "commits": np.array([len(repo.get("commit_messages") or []) for repo in repos], dtype=float),
+    }
+    for name in signals[0] if signals else []:
+        features[name] = np.array([s[name] for s in signals], dtype=float)
+    return features
+
+
+def _saturating(values: np.ndarray, saturation: float) -> np.ndarray:
+    return np.clip(np.log1p(values) / np.log1p(saturation), 0.0, 1.0)
+
+
+def score_repos(repos: List[dict]) -> List[dict]:
+    if not repos:
+        return []
+    f = extract_features(repos)
+    popularity = 100 * _saturating(f["stars"] + 2 * f["forks"], POPULARITY_SATURATION)
+    has_readme = np.maximum(f["readme_len"] > 0, f["has_readme_file"])
+    documentation = (
+        20 * has_readme
+        + 40 * _saturating(f["readme_len"], README_SATURATION)
+        + 10 * np.minimum(f["doc_files"] - f["has_readme_file"], 3)
+        + 10 * f["has_docs_dir"]
+    )
+    code_quality = 30 + 25 * f["has_tests"] + 20 * f["has_ci"] + 15 * f["has_lint"] + 10 * f["has_types"]
+    # Without a tree we cannot see tests/CI at all, so stay neutral instead of penalising.
+    code_quality = np.where(f["has_tree"] > 0, code_quality, 50)
+    scores = np.clip(np.rint(np.stack([popularity, documentation, code_quality])), 0, 100).astype(int)
+    results = []
+    for i in range(len(repos)):
+        results.append({
+            "popularity_score": int(scores[0, i]),
+            "documentation_score": int(scores[1, i]),
+            "code_quality_score": int(scores[2, i]),
+            "signals": {name: bool(values[i]) for name, values in f.items() if name.startswith("has_")},
+        })
+    return results
+
+
+def top_languages(language_maps: List[dict], limit: int = 3) -> List[str]:
+    totals: Counter = Counter()
+    for languages in language_maps:
+        if not languages:
+            continue
+        # Normalise per repo so one huge repo does not drown out the rest.
+        values = np.array([float(v) if isinstance(v, (int, float)) else 0.0 for v in languages.values()])
+        total = values.sum()
+        if total <= 0:
+            continue
+        for name, share in zip(languages.keys(), values / total):
+            totals[name] += share
+    return [name for name, _ in totals.most_common(limit)]
+
+
+def commit_patterns(messages: List[str]) -> Optional[dict]:
+    subjects = [m.strip().splitlines()[0] for m in messages if m and m.strip()]
+    if not subjects:
+        return None
+    lengths = np.array([len(s) for s in subjects], dtype=float)
+    conventional = np.array([bool(CONVENTIONAL_PATTERN.match(s)) for s in subjects])
+    low_effort = np.array([s.lower().rstrip(".!") in LOW_EFFORT_MESSAGES for s in subjects])
+    well_sized = (lengths >= 10) & (lengths <= 72)
+
+    patterns = []
+    if conventional.mean() >= 0.5:
+        patterns.append("Conventional commit messages")
+    if well_sized.mean() >= 0.7:
+        patterns.append("Concise, descriptive commit subjects")
+    if low_effort.mean() >= 0.3:
+        patterns.append("Many vague commit messages")
+    if len(subjects) >= 50:
+        patterns.append("Frequent commits")
+    return {
+        "consistency": int(round(100 * max(well_sized.mean(), conventional.mean()))),
+        "velocity": int(round(100 * _saturating(np.array([len(subjects)], dtype=float), VELOCITY_SATURATION)[0])),
+        "quality": int(round(100 * (1 - low_effort.mean()) * min(1.0, np.median(lengths) / 30))),
+        "patterns": patterns,
+        "confidence": round(min(1.0, len(subjects) / 50), 2),
+    }
+
+
+def repo_insights(score: dict, has_readme: bool) -> Dict[str, List[str]]:
+    signals = score["signals"]
+    strengths, improvements, recommendations = [], [], []
+    if score["popularity_score"] >= 50:
+        strengths.append("Gets real attention from other developers (stars and forks)")
+    if score["documentation_score"] >= 60:
+        strengths.append("Well documented")
+    elif not has_readme:
+        improvements.append("Missing README")
+        recommendations.append("Add a README explaining what the project does and how to run it")
+    else:
+        improvements.append("Documentation is thin")
+        recommendations.append("Expand the README with setup, usage and examples")
+    if signals.get("has_tree"):
+        if signals.get("has_tests"):
+            strengths.append("Has automated tests")
+        else:
+            improvements.append("No tests found")
+            recommendations.append("Add a test suite for the core logic")
+        if signals.get("has_ci"):
+            strengths.append("Continuous integration is set up")
+        else:
+            recommendations.append("Set up CI (for example GitHub Actions) to run tests on every push")
+        if not signals.get("has_lint"):
+            recommendations.append("Add a linter/formatter configuration to keep the code style consistent")
+    return {"strengths": strengths, "improvement_areas": improvements, "recommendations": recommendations}
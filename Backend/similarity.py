@@ -0,0 +1,200 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+import os
+import re
+import time
+import zlib
+import numpy as np
+
+SIMILAR_GOAL_CACHE_SIZE = int(os.environ.get("SIMILAR_GOAL_CACHE_SIZE", "2048"))
+SIMILAR_GOAL_THRESHOLD = float(os.environ.get("SIMILAR_GOAL_THRESHOLD", "0.85"))
+SIMILAR_GOAL_TTL = float(os.environ.get("SIMILAR_GOAL_TTL", str(24 * 3600)))
+SIMILARITY_DIMENSIONS = 2048  # Hashed feature space; power of two
+SIMILARITY_MAX_CHARS = 1000   # Per field; a long progress note says little more about the goal
+SIMILARITY_INITIAL_ROWS = 64
+
+WORD = re.compile(r"[a-z0-9][a-z0-9+#]*")
+STOPWORDS = {"a", "an", "and", "the", "i", "im", "my", "me", "to", "of", "in", "on", "for", "with", "is", "it", "be", "so", "far"}
+SUFFIXES = ("ing", "ed", "es", "s")
+
+
+def stem(word: str) -> str:
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+GOAL_FILLER = {stem(word) for word in ("learn", "master", "study", "understand", "get", "better", "now", "want", "how", "use", "start")}
+PROGRESS_BOILERPLATE = {stem(word) for word in (
+    "just", "started", "starting", "nothing", "anything", "yet", "none", "no", "not", "new", "beginning", "now", "today", "progress", "user", "haven", "t", "done"
+)}
+
+
+def features(text: str) -> List[str]:
+    # Stemmed words and word pairs for meaning, character trigrams so "ReactJS"/"React JS" still overlap.
+    words = [stem(word) for word in WORD.findall(text[:SIMILARITY_MAX_CHARS].lower()) if word not in STOPWORDS]
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f"<{word}>"
+        grams.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def terms(text: str) -> List[str]:
+    return sorted({stem(word) for word in WORD.findall(text[:SIMILARITY_MAX_CHARS].lower()) if word not in STOPWORDS})
+
+
+def goal_key(title: str) -> str:
+    """The goal's subject: its title terms without the filler every goal shares, so "Learning React Hooks" and "React hooks" agree."""
+    words = terms(title)
+    return " ".join(word for word in words if word not in GOAL_FILLER) or " ".join(words)
+
+
+def boilerplate(text: Optional[str]) -> bool:
+    # "Just started", "Nothing yet": says nothing about the goal, so it must not count towards a match.
+    return set(terms(text or "")) <= PROGRESS_BOILERPLATE
+
+
+def partition_key(partition: str) -> int:
+    return zlib.crc32(partition.strip().lower().encode("utf-8"))
+
+
+def vectorize(fields: Sequence[Tuple[str, float]], dimensions: int = SIMILARITY_DIMENSIONS) -> np.ndarray:
+    """Signed feature hashing with sublinear term counts. Each field is normalized before weighting so a long one cannot drown the rest."""
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for text, weight in fields:
+        if not text or weight <= 0:
+            continue
+        counts: Dict[int, float] = {}
+        for gram in features(text):
+            h = zlib.crc32(gram.encode("utf-8"))
+            index = h & (dimensions - 1)
+            counts[index] = counts.get(index, 0.0) + (1.0 if h & 0x80000000 else -1.0)
+        if not counts:
+            continue
+        indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        values = np.sign(values) * np.log1p(np.abs(values))
+        norm = np.linalg.norm(values)
+        if norm:
+            vector[indices] += weight * values / norm
+    return vector
+
+
+class SimilarityIndex:
+    """Stored results found by cosine similarity of hashed n-gram TF-IDF vectors, within a partition (e.g. a goal category).
+
+    Document frequencies follow the stored rows, so terms every entry shares weigh little.
+    IDF weights and row norms are refreshed after every eighth of the index has been added, so a
+    lookup only touches the query's non-zero columns. Fields with no text are stored too: an empty
+    query matches only empty rows. Full, it evicts expired rows first, then the least recently used one.
+    """
+
+    def __init__(self, max_size: int = SIMILAR_GOAL_CACHE_SIZE, threshold: float = SIMILAR_GOAL_THRESHOLD, ttl: float = SIMILAR_GOAL_TTL, dimensions: int = SIMILARITY_DIMENSIONS):
+        self.max_size = max_size
+        self.threshold = threshold
+        self.ttl = ttl
+        self.dimensions = dimensions
+        rows = min(max_size, SIMILARITY_INITIAL_ROWS)
+        self._vectors = np.zeros((rows, dimensions), dtype=np.float32)
+        self._partitions = np.full(rows, -1, dtype=np.int64)
+        self._expires = np.zeros(rows, dtype=np.float64)
+        self._used = np.zeros(rows, dtype=np.float64)
+        self._values: List[Optional[dict]] = [None] * rows
+        self._norms = np.zeros(rows, dtype=np.float32)
+        self._df = np.zeros(dimensions, dtype=np.float64)
+        self._idf = np.ones(dimensions, dtype=np.float32)
+        self._pending = 0
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.evicted = 0
+
+    def _refresh(self):
+        self._idf = (np.log((1.0 + self.size) / (1.0 + self._df)) + 1.0).astype(np.float32)
+        self._norms = np.sqrt((self._vectors ** 2) @ (self._idf ** 2))
+        self._pending = 0
+
+    def lookup(self, partition: str, fields: Sequence[Tuple[str, float]]) -> Optional[Tuple[dict, float]]:
+        """Returns the most similar live result in the partition and its similarity, if it clears the threshold."""
+        if not self.max_size:
+            return None
+        now = time.time()
+        candidates = np.flatnonzero((self._partitions == partition_key(partition)) & (self._expires > now))
+        query = vectorize(fields, self.dimensions)
+        columns = np.flatnonzero(query)
+        if not candidates.size:
+            self.misses += 1
+            return None
+        if columns.size:
+            weighted = query[columns] * self._idf[columns]
+            norms = self._norms[candidates] * np.linalg.norm(weighted)
+            scores = (self._vectors[np.ix_(candidates, columns)] @ (weighted * self._idf[columns])) / np.where(norms > 0, norms, 1.0)
+        else:
+            scores = (self._norms[candidates] == 0).astype(np.float32)
+        best = int(np.argmax(scores))
+        similarity = float(scores[best])
+        if similarity < self.threshold:
+            self.misses += 1
+            return None
+        slot = int(candidates[best])
+        self._used[slot] = now
+        self.hits += 1
+        return dict(self._values[slot]), similarity
+
+    def _free_slot(self, now: float) -> int:
+        rows = len(self._values)
+        if self.size < rows:
+            return self._values.index(None)
+        if rows < self.max_size:
+            grow = min(self.max_size, rows * 2) - rows
+            self._vectors = np.vstack([self._vectors, np.zeros((grow, self.dimensions), dtype=np.float32)])
+            self._partitions = np.concatenate([self._partitions, np.full(grow, -1, dtype=np.int64)])
+            self._expires = np.concatenate([self._expires, np.zeros(grow)])
+            self._used = np.concatenate([self._used, np.zeros(grow)])
+            self._norms = np.concatenate([self._norms, np.zeros(grow, dtype=np.float32)])
+            self._values.extend([None] * grow)
+            return rows
+        expired = np.flatnonzero(self._expires <= now)
+        slot = int(expired[0]) if expired.size else int(np.argmin(self._used))
+        self._remove(slot)
+        self.evicted += 1
+        return slot
+
+    def _remove(self, slot: int):
+        self._df -= self._vectors[slot] != 0
+        self._vectors[slot] = 0
+        self._norms[slot] = 0
+        self._partitions[slot] = -1
+        self._values[slot] = None
+        self.size -= 1
+
+    def add(self, partition: str, fields: Sequence[Tuple[str, float]], value: dict):
+        if not self.max_size:
+            return
+        vector = vectorize(fields, self.dimensions)
+        now = time.time()
+        slot = self._free_slot(now)
+        self._vectors[slot] = vector
+        self._df += vector != 0
+        self._partitions[slot] = partition_key(partition)
+        self._expires[slot] = now + self.ttl
+        self._used[slot] = now
+        self._values[slot] = dict(value)
+        self._norms[slot] = np.linalg.norm(vector * self._idf)
+        self.size += 1
+        self.stored += 1
+        self._pending += 1
+        if self._pending * 8 >= self.size:
+            self._refresh()
+
+    def stats(self) -> dict:
+        return {
+            "entries": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stored": self.stored,
+            "evicted": self.evicted,
+            "threshold": self.threshold,
+        }
@@ -0,0 +1,87 @@
+from typing import Any, List, Tuple
+import json
+import orjson
+
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {orjson.dumps(data).decode('utf-8')}\n\n"
+
+
+class IncrementalJSONParser:
+    """Emits each top-level member of a streamed JSON object once it is complete.
+
+    Text before the reply's '{' is ignored, so the usual chatter an LLM puts around
+    its JSON reply does not break parsing. An object whose first member is not JSON,
+    such as "{name}" in that chatter, is skipped to its closing brace and the next '{'
+    after it is tried.
+    """
+
+    def __init__(self):
+        self.result: dict = {}
+        self.complete = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member: List[str] = []
+        self._skipping = False
+
+    def _flush(self) -> List[Tuple[str, Any]]:
+        text = "".join(self._member).strip()
+        self._member = []
+        if not text:
+            return []
+        try:
+            member = json.loads("{" + text + "}")
+        except ValueError:
+            return []
+        self.result.update(member)
+        return list(member.items())
+
+    def _abandon(self):
+        # Depth keeps being tracked, so braces nested in the skipped object are not taken for a new one.
+        self._skipping = True
+        self._member = []
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        fields = []
+        for char in chunk:
+            if self.complete:
+                break
+            if self._depth == 0:
+                if char == "{":
+                    self._depth = 1
+                continue
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    if self._skipping:
+                        self._skipping = False
+                        continue
+                    fields.extend(self._flush())
+                    if not self.result:
+                        self._member = []
+                        continue
+                    self.complete = True
+                    continue
+            if self._skipping:
+                continue
+            if char == "," and self._depth == 1 and not self._in_string:
+                flushed = self._flush()
+                if not flushed and not self.result:
+                    self._abandon()
+                    continue
+                fields.extend(flushed)
+                continue
+            self._member.append(char)
+        return fields
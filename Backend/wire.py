@@ -0,0 +1,261 @@
+from fastapi import HTTPException, Request
+from fastapi.routing import APIRoute
+from typing import Any, Callable, List, Optional
+import gzip
+import io
+import logging
+import os
+import zlib
+import orjson
+
+try:
+    import zstandard
+except ImportError:  # zstd support is optional
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+WIRE_MAX_BODY_BYTES = int(os.environ.get("WIRE_MAX_BODY_BYTES", str(8 * 1024 * 1024)))
+WIRE_MAX_DECODED_BYTES = int(os.environ.get("WIRE_MAX_DECODED_BYTES", str(32 * 1024 * 1024)))
+WIRE_MIN_COMPRESS_BYTES = int(os.environ.get("WIRE_MIN_COMPRESS_BYTES", "1024"))
+WIRE_GZIP_LEVEL = int(os.environ.get("WIRE_GZIP_LEVEL", "5"))
+WIRE_ZSTD_LEVEL = int(os.environ.get("WIRE_ZSTD_LEVEL", "3"))
+WIRE_MAX_TREE_ENTRIES = int(os.environ.get("WIRE_MAX_TREE_ENTRIES", "200000"))
+
+COMPRESSIBLE_TYPES = (b"application/json", b"application/x-ndjson", b"text/")
+
+
+class PayloadTooLarge(Exception):
+    pass
+
+
+def supported_encodings() -> List[str]:
+    return ["zstd", "gzip"] if zstandard is not None else ["gzip"]
+
+
+def can_decode(encoding: str) -> bool:
+    return encoding in ("gzip", "deflate") or encoding == "zstd" and zstandard is not None
+
+
+def _read_limited(reader, limit: int) -> bytes:
+    # Inflate in bounded reads so a zip bomb is stopped at the limit instead of after expanding it.
+    out: List[bytes] = []
+    size = 0
+    while True:
+        piece = reader.read(64 * 1024)
+        if not piece:
+            return b"".join(out)
+        size += len(piece)
+        if size > limit:
+            raise PayloadTooLarge(f"Decoded body exceeds {limit} bytes")
+        out.append(piece)
+
+
+def decode_body(body: bytes, encoding: str, limit: int = WIRE_MAX_DECODED_BYTES) -> bytes:
+    if encoding == "gzip":
+        return _read_limited(gzip.GzipFile(fileobj=io.BytesIO(body)), limit)
+    if encoding == "deflate":
+        decoder = zlib.decompressobj()
+        data = decoder.decompress(body, limit + 1)
+        if len(data) > limit:
+            raise PayloadTooLarge(f"Decoded body exceeds {limit} bytes")
+        return data
+    if encoding == "zstd" and zstandard is not None:
+        return _read_limited(zstandard.ZstdDecompressor().stream_reader(io.BytesIO(body)), limit)
+    raise ValueError(f"Unsupported Content-Encoding: {encoding}")
+
+
+def encode_body(body: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=WIRE_ZSTD_LEVEL).compress(body)
+    return gzip.compress(body, compresslevel=WIRE_GZIP_LEVEL)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    offered = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            offered[name] = quality
+    for encoding in supported_encodings():
+        if offered.get(encoding, offered.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+def expand_tree(tree: Any) -> Any:
+    """Accepts the compact columnar tree {"path": [...], "type": [...], "size": [...]} and expands it to entry dicts."""
+    if isinstance(tree, dict):
+        paths = tree.get("path")
+        if not isinstance(paths, list):
+            raise ValueError("Compact tree needs a 'path' list")
+        types = tree.get("type") or []
+        sizes = tree.get("size") or []
+        if len(paths) > WIRE_MAX_TREE_ENTRIES:
+            raise ValueError(f"Tree has more than {WIRE_MAX_TREE_ENTRIES} entries")
+        if len(types) not in (0, len(paths)) or len(sizes) not in (0, len(paths)):
+            raise ValueError("Compact tree columns must have the same length")
+        entries = []
+        for i, path in enumerate(paths):
+            kind = types[i] if types else "blob"
+            entry = {"path": path, "type": "tree" if kind in ("tree", "t") else "blob"}
+            if sizes and sizes[i] is not None:
+                entry["size"] = sizes[i]
+            entries.append(entry)
+        return entries
+    if isinstance(tree, list) and len(tree) > WIRE_MAX_TREE_ENTRIES:
+        raise ValueError(f"Tree has more than {WIRE_MAX_TREE_ENTRIES} entries")
+    return tree
+
+
+class ORJSONRequest(Request):
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            self._json = orjson.loads(await self.body())
+        return self._json
+
+
+class ORJSONRoute(APIRoute):
+    # Request bodies are parsed with orjson instead of the stdlib json module.
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request):
+            return await handler(ORJSONRequest(request.scope, request.receive))
+        return route_handler
+
+
+class WireMiddleware:
+    """Enforces body limits, decodes compressed request bodies and compresses whole (non-streamed) responses."""
+
+    def __init__(self, app, max_body: int = WIRE_MAX_BODY_BYTES, max_decoded: int = WIRE_MAX_DECODED_BYTES, min_compress: int = WIRE_MIN_COMPRESS_BYTES):
+        self.app = app
+        self.max_body = max_body
+        self.max_decoded = max_decoded
+        self.min_compress = min_compress
+
+    async def _reject(self, send, status: int, detail: str):
+        body = orjson.dumps({"detail": detail})
+        await send({"type": "http.response.start", "status": status, "headers": [
+            (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()), (b"connection", b"close")
+        ]})
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_body:
+            await self._reject(send, 413, f"Request body exceeds {self.max_body} bytes.")
+            return
+
+        encoding = headers.get(b"content-encoding", b"").decode("latin-1").strip().lower()
+        if encoding and encoding != "identity":
+            if not can_decode(encoding):
+                await self._reject(send, 415, f"Unsupported Content-Encoding '{encoding}'. Use one of: {', '.join(supported_encodings())}.")
+                return
+            chunks: List[bytes] = []
+            size = 0
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return
+                chunk = message.get("body", b"")
+                size += len(chunk)
+                if size > self.max_body:
+                    await self._reject(send, 413, f"Request body exceeds {self.max_body} bytes.")
+                    return
+                chunks.append(chunk)
+                if not message.get("more_body", False):
+                    break
+            try:
+                body = decode_body(b"".join(chunks), encoding, self.max_decoded)
+            except PayloadTooLarge:
+                await self._reject(send, 413, f"Decoded request body exceeds {self.max_decoded} bytes.")
+                return
+            except Exception as e:
+                logger.warning(f"Failed to decode {encoding} request body: {e}")
+                await self._reject(send, 400, f"Malformed {encoding} request body.")
+                return
+            # Rewrite in place: outer middleware (metrics) reads scope["route"], which routing sets on this same dict.
+            scope["headers"] = [
+                (name, value) for name, value in scope["headers"] if name not in (b"content-encoding", b"content-length")
+            ] + [(b"content-length", str(len(body)).encode())]
+            receive = self._replay(body, receive)
+        else:
+            receive = self._limited(receive)
+
+        response_encoding = choose_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if response_encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, self._compressing(send, response_encoding))
+
+    def _replay(self, body: bytes, receive):
+        sent = False
+
+        async def replay():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            # Afterwards behave like the real channel so disconnects are still seen.
+            return await receive()
+        return replay
+
+    def _limited(self, receive):
+        size = 0
+
+        async def limited():
+            nonlocal size
+            message = await receive()
+            if message["type"] == "http.request":
+                size += len(message.get("body", b""))
+                # Chunked uploads without Content-Length are only caught while the body is read.
+                if size > self.max_body:
+                    raise HTTPException(status_code=413, detail=f"Request body exceeds {self.max_body} bytes.")
+            return message
+        return limited
+
+    def _compressing(self, send, encoding: str):
+        start = None
+
+        async def compressing(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+            pending, start = start, None
+            body = message.get("body", b"")
+            headers = [(name.lower(), value) for name, value in pending.get("headers", [])]
+            content_type = dict(headers).get(b"content-type", b"")
+            # Streamed responses (SSE, NDJSON) go out uncompressed so each event is flushed as it happens.
+            if (
+                message.get("more_body", False)
+                or len(body) < self.min_compress
+                or b"content-encoding" in dict(headers)
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+            ):
+                await send(pending)
+                await send(message)
+                return
+            compressed = encode_body(body, encoding)
+            headers = [(name, value) for name, value in headers if name != b"content-length"] + [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(compressed)).encode()),
+                (b"vary", b"Accept-Encoding"),
+            ]
+            await send({**pending, "headers": headers})
+            await send({**message, "body": compressed})
+        return compressing